@@ -0,0 +1,204 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class AudioCache:
+    """Two-tier (memory + disk) LRU cache of decoded speech audio.
+
+    Entries are keyed on the exact text sent to the synthesizer together with
+    the language, the ``slow`` flag and the backend's ``cache_namespace``, so
+    callers should pass the text *after* dialect substitution. The disk tier
+    is a directory of ``.npz`` files that can be shared by several processes:
+    writes go through a temp file and an atomic rename, and recency is tracked
+    through file modification times.
+    """
+
+    def __init__(self, cache_dir=None, max_disk_bytes=512 * 1024 * 1024,
+                 max_memory_bytes=64 * 1024 * 1024):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'marathi_tts')
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = None
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+        if self.max_disk_bytes:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(text, lang='mr', slow=False, namespace=''):
+        """Build the content address for a synthesis request.
+
+        The empty namespace (gTTS) keeps the original key layout, so existing
+        cache directories stay valid.
+        """
+        raw = f"{lang}\0{int(bool(slow))}\0{text}"
+        if namespace:
+            raw = f"{namespace}\0{raw}"
+        raw = raw.encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()
+
+    def get(self, text, lang='mr', slow=False, namespace=''):
+        """Return ``(audio_data, sample_rate)`` or None when the entry is missing"""
+        key = self.make_key(text, lang, slow, namespace)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, text, lang, slow, audio_data, sample_rate, namespace=''):
+        """Store decoded audio and return the cached ``(audio_data, sample_rate)`` pair"""
+        audio_data = np.array(audio_data, dtype=np.float32)
+        audio_data.flags.writeable = False
+        entry = (audio_data, int(sample_rate))
+        key = self.make_key(text, lang, slow, namespace)
+
+        with self._lock:
+            self._stats['stores'] += 1
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+        return entry
+
+    def stats(self):
+        """Return hit/miss counters and current tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+            stats['disk_bytes'] = self._disk_bytes or 0
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.npz'):
+                    self._remove(os.path.join(self.cache_dir, name))
+        self._disk_bytes = 0
+
+    def _remember(self, key, entry):
+        # Caller must hold self._lock
+        size = entry[0].nbytes
+        if size > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous[0].nbytes
+        self._memory[key] = entry
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.npz')
+
+    def _read_disk(self, key):
+        if not self.max_disk_bytes:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                audio_data = data['audio']
+                sample_rate = int(data['sample_rate'])
+            # Touch the file so the disk tier evicts least recently used entries
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            # Missing, evicted by another process, or partially written
+            return None
+        audio_data.flags.writeable = False
+        return audio_data, sample_rate
+
+    def _write_disk(self, key, entry):
+        if not self.max_disk_bytes:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                np.savez(f, audio=entry[0], sample_rate=np.int64(entry[1]))
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error writing audio cache entry: {str(e)}")
+            self._remove(temp_path)
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_bytes()
+            else:
+                self._disk_bytes += size
+            over_limit = self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _scan_disk_bytes(self):
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                try:
+                    total += os.path.getsize(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+        return total
+
+    def _evict_disk(self):
+        """Delete least recently used files until the disk tier is back under 90% of its limit"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npz'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_disk_bytes * 0.9)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            if self._remove(path):
+                evicted += 1
+            total -= size
+
+        with self._lock:
+            self._disk_bytes = total
+            self._stats['evictions'] += evicted
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
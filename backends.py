@@ -0,0 +1,203 @@
+import base64
+import hashlib
+import io
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import soundfile as sf
+
+
+class SynthesisError(Exception):
+    """Raised when a backend cannot produce audio for a text"""
+
+
+class RateLimiter:
+    """Spaces calls so that at most ``rate`` start per second, across threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class SynthesisBackend:
+    """Base class for speech synthesizers used by ``MarathiTTS``.
+
+    Subclasses implement ``fetch()``, which returns an encoded payload, and
+    ``decode()``, which turns it into ``(audio_data, sample_rate)``.
+    ``synthesize()`` runs both with rate limiting and retries with exponential
+    backoff. ``cache_namespace`` separates a backend's entries in a shared
+    ``AudioCache``; backends whose audio differs must use different values.
+    """
+
+    cache_namespace = ''
+
+    def __init__(self, retries=2, backoff=0.5, requests_per_second=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limiter = RateLimiter(requests_per_second) if requests_per_second else None
+
+    def fetch(self, text, lang='mr', slow=False):
+        raise NotImplementedError
+
+    def decode(self, payload):
+        raise NotImplementedError
+
+    def synthesize(self, text, lang='mr', slow=False):
+        """Return decoded ``(audio_data, sample_rate)`` for text"""
+        for attempt in range(self.retries + 1):
+            try:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.acquire()
+                return self.decode(self.fetch(text, lang, slow))
+            except Exception as e:
+                if attempt == self.retries:
+                    if isinstance(e, SynthesisError):
+                        raise
+                    raise SynthesisError(str(e)) from e
+                time.sleep(self.backoff * 2 ** attempt)
+
+
+class GTTSBackend(SynthesisBackend):
+    """Google Translate TTS through gTTS, over one pooled HTTP session.
+
+    gTTS opens a new session per request; here the requests gTTS prepares are
+    sent through a shared ``requests.Session`` so connections are reused across
+    sentences and threads. This uses gTTS internals, so its version is pinned.
+    """
+
+    def __init__(self, timeout=15, pool_size=16, **kwargs):
+        super().__init__(**kwargs)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def _get_session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+
+    def fetch(self, text, lang='mr', slow=False):
+        """Return the MP3 bytes for text"""
+        import requests
+        from gtts import gTTS, gTTSError
+
+        session = self._get_session()
+        tts = gTTS(text=text, lang=lang, slow=slow, timeout=self.timeout)
+        # _prepare_requests() is private to gTTS; requirements.txt pins the
+        # version this was written against
+        prepare = getattr(tts, '_prepare_requests', None)
+        if prepare is None:
+            raise SynthesisError("Installed gTTS has no _prepare_requests(); install the version pinned "
+                                 "in requirements.txt")
+        rpc = getattr(tts, 'GOOGLE_TTS_RPC', 'jQ1olc')
+        mp3 = bytearray()
+        for request in prepare():
+            response = None
+            try:
+                response = session.send(request, timeout=self.timeout)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                # gTTSError turns the status code into a probable cause
+                raise gTTSError(tts=tts, response=response) from e
+            for line in response.iter_lines(chunk_size=1024):
+                decoded_line = line.decode('utf-8')
+                if rpc not in decoded_line:
+                    continue
+                audio_search = re.search(re.escape(rpc) + r'","\[\\"(.*)\\"]', decoded_line)
+                if not audio_search:
+                    raise gTTSError(tts=tts, response=response)
+                mp3 += base64.b64decode(audio_search.group(1).encode('ascii'))
+        if not mp3:
+            raise SynthesisError("gTTS returned no audio")
+        return bytes(mp3)
+
+    def decode(self, payload):
+        return sf.read(io.BytesIO(payload), dtype='float32')
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class OfflineBackend(SynthesisBackend):
+    """Deterministic synthetic speech for offline tests and benchmarks.
+
+    The same text always yields the same audio: voiced syllable-like tones whose
+    length scales with the number of characters, with silence for spaces and
+    punctuation. ``latency`` (plus up to ``latency_jitter``) seconds are slept
+    per fetch, and ``failure_rate`` of fetches raise ``SynthesisError``.
+    Failures are decided per text and attempt, so retries can succeed.
+    """
+
+    def __init__(self, sample_rate=24000, seconds_per_char=0.065, latency=0.0, latency_jitter=0.0,
+                 failure_rate=0.0, seed=0, **kwargs):
+        kwargs.setdefault('backoff', 0.0)
+        super().__init__(**kwargs)
+        self.sample_rate = sample_rate
+        self.seconds_per_char = seconds_per_char
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        # Synthetic audio must never be served to gTTS runs sharing the cache
+        self.cache_namespace = f"offline:{sample_rate}:{seconds_per_char}:{seed}"
+        self._attempts = Counter()
+        self._lock = threading.Lock()
+
+    def _rng(self, *parts):
+        digest = hashlib.sha256('\0'.join(str(p) for p in (self.seed,) + parts).encode('utf-8')).digest()
+        return np.random.default_rng(int.from_bytes(digest[:8], 'little'))
+
+    def fetch(self, text, lang='mr', slow=False):
+        """Return 16-bit PCM bytes, standing in for an encoded response"""
+        with self._lock:
+            attempt = self._attempts[(text, lang, slow)]
+            self._attempts[(text, lang, slow)] += 1
+        rng = self._rng(text, lang, slow, attempt)
+        delay = self.latency + self.latency_jitter * rng.random()
+        if delay:
+            time.sleep(delay)
+        if self.failure_rate and rng.random() < self.failure_rate:
+            raise SynthesisError("injected synthesis failure")
+        return self._render(text, slow).tobytes()
+
+    def decode(self, payload):
+        pcm = np.frombuffer(payload, dtype=np.int16)
+        return pcm.astype(np.float32) / 32768.0, self.sample_rate
+
+    def _render(self, text, slow):
+        rng = self._rng(text, slow)
+        slot = int(self.seconds_per_char * (1.5 if slow else 1.0) * self.sample_rate)
+        chars = text.strip() or ' '
+        voiced = np.array([not (c.isspace() or c in '।?!.,;:"\'') for c in chars])
+
+        # One slot per character: a raised-cosine envelope over a harmonic tone
+        f0 = np.repeat(rng.uniform(110.0, 220.0, len(chars)), slot)
+        phase = 2 * np.pi * np.cumsum(f0) / self.sample_rate
+        tone = np.sin(phase) + 0.5 * np.sin(2 * phase) + 0.25 * np.sin(3 * phase)
+        envelope = np.tile(np.hanning(slot), len(chars)) * np.repeat(voiced * rng.uniform(0.2, 0.4, len(chars)), slot)
+        audio = tone * envelope + rng.normal(0.0, 0.003, len(tone))
+        return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
@@ -0,0 +1,184 @@
+"""Headless batch synthesis from a JSONL or CSV manifest.
+
+Each manifest row has ``id``, ``text``, ``output`` and optionally ``dialect``
+(default ``standard``) and ``emotion`` (default ``neutral``); the output
+extension picks WAV, FLAC, OGG or OPUS. Network fetches
+run on a thread pool while the DSP runs on a process pool sized to the CPU
+count. Finished ids are appended to a checkpoint file, so rerunning the same
+command after an interruption skips work that is already done.
+
+    python batch.py prompts.jsonl --workers 8 --fetch-workers 16
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from backends import OfflineBackend
+from encoders import write_audio
+from marathi_tts import MarathiTTS
+
+_worker_engine = None
+
+
+def _init_worker(sample_rate=None):
+    global _worker_engine
+    # DSP workers never fetch, so they do not need the cache
+    _worker_engine = MarathiTTS(use_cache=False)
+    _worker_engine.sample_rate = sample_rate
+
+
+def _render_item(item, pieces):
+    """Process pool task: run the DSP stage and write the output atomically"""
+    audio_data, sample_rate = _worker_engine.render(pieces, item['dialect'], item['emotion'])
+    output = item['output']
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    root, ext = os.path.splitext(output)
+    partial = f"{root}.partial-{os.getpid()}{ext}"
+    try:
+        write_audio(partial, audio_data, sample_rate, _worker_engine.sample_rate)
+        os.replace(partial, output)
+    finally:
+        if os.path.exists(partial):
+            os.unlink(partial)
+    return len(audio_data) / sample_rate
+
+
+def read_manifest(path):
+    """Return the manifest rows as dicts with defaults filled in"""
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    items = []
+    for number, row in enumerate(rows, 1):
+        missing = [field for field in ('id', 'text', 'output') if not row.get(field)]
+        if missing:
+            raise ValueError(f"manifest row {number} is missing {', '.join(missing)}")
+        items.append({
+            'id': str(row['id']),
+            'text': row['text'],
+            'dialect': row.get('dialect') or 'standard',
+            'emotion': row.get('emotion') or 'neutral',
+            'output': row['output'],
+        })
+    return items
+
+
+class Checkpoint:
+    """Append-only record of finished ids, flushed to disk after every item"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.done = {line.rstrip('\n') for line in f if line.strip()}
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def record(self, item_id):
+        self._file.write(item_id + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.done.add(item_id)
+
+    def close(self):
+        self._file.close()
+
+
+def run(items, checkpoint, engine, workers, fetch_workers, max_in_flight, sample_rate=None):
+    """Synthesize items, overlapping fetches with DSP; returns summary counters"""
+    todo = [item for item in items if item['id'] not in checkpoint.done]
+    pending = iter(todo)
+    summary = {'done': 0, 'failed': 0, 'skipped': len(items) - len(todo), 'audio_seconds': 0.0}
+
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(sample_rate,)) as dsp_pool:
+        fetching = {}
+        rendering = {}
+
+        def top_up():
+            # Bound the number of decoded items held in memory at once
+            while len(fetching) + len(rendering) < max_in_flight:
+                item = next(pending, None)
+                if item is None:
+                    return
+                future = fetch_pool.submit(engine.fetch, item['text'], item['dialect'], item['emotion'])
+                fetching[future] = item
+
+        def fail(item, error):
+            summary['failed'] += 1
+            print(f"Error synthesizing {item['id']}: {str(error)}", file=sys.stderr)
+
+        top_up()
+        while fetching or rendering:
+            finished, _ = wait(list(fetching) + list(rendering), return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future in fetching:
+                    item = fetching.pop(future)
+                    try:
+                        pieces = future.result()
+                    except Exception as e:
+                        fail(item, e)
+                        continue
+                    rendering[dsp_pool.submit(_render_item, item, pieces)] = item
+                else:
+                    item = rendering.pop(future)
+                    try:
+                        audio_seconds = future.result()
+                    except Exception as e:
+                        fail(item, e)
+                        continue
+                    checkpoint.record(item['id'])
+                    summary['done'] += 1
+                    summary['audio_seconds'] += audio_seconds
+            top_up()
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch Marathi text-to-speech synthesis")
+    parser.add_argument('manifest', help="JSONL or CSV file with id, text, dialect, emotion, output")
+    parser.add_argument('--checkpoint', help="finished-id file (default: <manifest>.done)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="DSP processes")
+    parser.add_argument('--fetch-workers', type=int, default=8, help="concurrent network fetches")
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help="items fetched but not yet written (default: 4 x workers)")
+    parser.add_argument('--sample-rate', type=int, default=None,
+                        help="output sample rate, e.g. 8000 or 16000 (default: the synthesis rate)")
+    parser.add_argument('--cache-dir', default=None, help="synthesis cache directory")
+    parser.add_argument('--no-cache', action='store_true', help="disable the synthesis cache")
+    parser.add_argument('--offline', action='store_true',
+                        help="use the deterministic offline backend instead of gTTS (for load tests)")
+    args = parser.parse_args(argv)
+
+    items = read_manifest(args.manifest)
+    checkpoint = Checkpoint(args.checkpoint or args.manifest + '.done')
+    backend = OfflineBackend() if args.offline else None
+    engine = MarathiTTS(cache_dir=args.cache_dir, use_cache=not args.no_cache, fetch_workers=args.fetch_workers,
+                        backend=backend)
+
+    start = time.perf_counter()
+    try:
+        summary = run(items, checkpoint, engine, args.workers, args.fetch_workers,
+                      args.max_in_flight or 4 * args.workers, args.sample_rate)
+    finally:
+        checkpoint.close()
+    elapsed = time.perf_counter() - start
+
+    print(f"done {summary['done']}, skipped {summary['skipped']}, failed {summary['failed']} "
+          f"in {elapsed:.1f}s")
+    if elapsed > 0:
+        print(f"throughput: {summary['done'] / elapsed:.2f} items/s, "
+              f"{summary['audio_seconds'] / elapsed:.2f} audio-seconds/s")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Benchmark: batched EffectChain processing vs the per-utterance loop.
+
+Short prompts of random length are processed once with chain.apply() per item
+and once with MarathiTTS.process_batch(), for batch sizes from 1 to 1024.
+Run from the repository root:
+
+    python benchmarks/bench_batch.py --dialect varhadi --emotion happy --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marathi_tts import MarathiTTS
+
+BATCH_SIZES = (1, 4, 16, 64, 256, 1024)
+
+
+def best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dialect', default='varhadi')
+    parser.add_argument('--emotion', default='happy')
+    parser.add_argument('--min-seconds', type=float, default=0.3, help="shortest prompt")
+    parser.add_argument('--max-seconds', type=float, default=2.0, help="longest prompt")
+    parser.add_argument('--bucket-size', type=int, default=64)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(BATCH_SIZES))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    tts = MarathiTTS(use_cache=False)
+    chain = tts.effect_chain(args.dialect, args.emotion)
+    rng = np.random.default_rng(0)
+    # sf.read of the gTTS MP3 yields 24 kHz mono
+    lengths = rng.uniform(args.min_seconds, args.max_seconds, max(args.sizes)) * 24000
+    audios = [(0.2 * rng.standard_normal(int(length))).astype(np.float32) for length in lengths]
+
+    print(f"{args.dialect}/{args.emotion}, rate {chain.rate:.3f}, bucket size {args.bucket_size}")
+    print(f"{'batch':>6} {'loop ms/item':>13} {'batch ms/item':>14} {'speedup':>8} {'max diff':>9}")
+    for size in args.sizes:
+        items = audios[:size]
+        loop_time = best_time(lambda: [chain.apply(audio) for audio in items], args.repeat)
+        batch_time = best_time(lambda: tts.process_batch(items, args.dialect, args.emotion, args.bucket_size),
+                               args.repeat)
+        diff = max(float(np.max(np.abs(a - b), initial=0.0)) for a, b in
+                   zip([chain.apply(audio) for audio in items],
+                       tts.process_batch(items, args.dialect, args.emotion, args.bucket_size)))
+        print(f"{size:>6} {loop_time / size * 1e3:>13.2f} {batch_time / size * 1e3:>14.2f} "
+              f"{loop_time / batch_time:>7.1f}x {diff:>9.1e}")
+
+
+if __name__ == '__main__':
+    main()
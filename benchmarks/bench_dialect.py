@@ -0,0 +1,73 @@
+"""Micro-benchmark: compiled single-pass dialect substitution vs the old per-rule loop.
+
+Run from the repository root:
+
+    python benchmarks/bench_dialect.py --chars 1000000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marathi_tts import MarathiDialect, MarathiTTS
+
+SAMPLE = (
+    "मला आज शाळेत जायचे आहे, पण तुला काय वाटते? "
+    "आपण उद्या गावाला जाऊ. तो खूप छान बोलतो आणि करतो! "
+    "मी घरी जातो, तू कसं आहेस? हे काम झाला नाही, मला मदत पाहिजे. "
+    "वळणावर पिवळा वाडा आहे; त्याच्या बाजूला जुना पूल आहे. "
+)
+
+
+def legacy_apply(substitutions, text):
+    """The original implementation: one full str.replace pass per rule"""
+    for original, replacement in substitutions.items():
+        text = text.replace(original, replacement)
+    return text
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chars', type=int, default=1_000_000, help="approximate corpus size in characters")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = SAMPLE * max(1, args.chars // len(SAMPLE))
+    tts = MarathiTTS(use_cache=False)
+
+    print(f"corpus: {len(corpus):,} characters")
+    print(f"{'dialect':<10} {'rules':>5} {'loop (s)':>10} {'compiled (s)':>13} {'speedup':>8} {'same output':>12}")
+    for key, dialect in tts.dialects.items():
+        loop_time = best_of(lambda: legacy_apply(dialect.substitutions, corpus), args.repeat)
+        compiled_time = best_of(lambda: dialect.apply_dialect(corpus), args.repeat)
+        same = legacy_apply(dialect.substitutions, corpus) == dialect.apply_dialect(corpus)
+        speedup = loop_time / compiled_time if compiled_time else float('inf')
+        print(f"{key:<10} {len(dialect.substitutions):>5} {loop_time:>10.4f} {compiled_time:>13.4f} "
+              f"{speedup:>7.2f}x {str(same):>12}")
+
+    # The loop costs one pass per rule, so larger tables show the scaling difference
+    words = sorted(set(SAMPLE.split()))
+    for size in (25, 50, 100):
+        # Real words first, then numbered variants that never match, to grow the table
+        keys = words + [f"{word}{i}" for i in range(size) for word in words]
+        table = {key: key + 'ं' for key in keys[:size]}
+        dialect = MarathiDialect('synthetic', table)
+        loop_time = best_of(lambda: legacy_apply(table, corpus), args.repeat)
+        compiled_time = best_of(lambda: dialect.apply_dialect(corpus), args.repeat)
+        speedup = loop_time / compiled_time if compiled_time else float('inf')
+        print(f"{'synthetic':<10} {len(table):>5} {loop_time:>10.4f} {compiled_time:>13.4f} {speedup:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
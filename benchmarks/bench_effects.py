@@ -0,0 +1,64 @@
+"""Benchmark: fused EffectChain vs the old separate rhythm/articulation/emotion passes.
+
+Run from the repository root:
+
+    python benchmarks/bench_effects.py --seconds 10 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marathi_tts import MarathiTTS
+
+
+def legacy_process(tts, audio_data, dialect, emotion):
+    """The original basic-path post-processing, stage by stage in float64"""
+    audio_data = audio_data.astype(np.float64)
+    dialect_obj = tts.dialects[dialect]
+    audio_data = tts.emotion_modifier.change_rhythm(audio_data, dialect_obj.rhythm_pattern)
+    modified = np.mean(audio_data) + (audio_data - np.mean(audio_data)) * dialect_obj.articulation
+    return tts.emotion_modifier.modify_audio(modified, emotion)
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=10.0, help="utterance length")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tts = MarathiTTS(use_cache=False)
+    rng = np.random.default_rng(0)
+    # sf.read of the gTTS MP3 yields 24 kHz mono
+    audio_data = (0.2 * rng.standard_normal(int(args.seconds * 24000))).astype(np.float32)
+
+    print(f"{'dialect':<9} {'emotion':<8} {'legacy ms':>10} {'fused ms':>9} {'legacy MB':>10} {'fused MB':>9}")
+    for dialect in tts.dialects:
+        for emotion in ('neutral', 'happy', 'angry', 'sad'):
+            chain = tts.effect_chain(dialect, emotion)
+            legacy_time, legacy_peak = measure(lambda: legacy_process(tts, audio_data, dialect, emotion), args.repeat)
+            fused_time, fused_peak = measure(lambda: chain.apply(audio_data), args.repeat)
+            print(f"{dialect:<9} {emotion:<8} {legacy_time * 1e3:>10.1f} {fused_time * 1e3:>9.1f} "
+                  f"{legacy_peak / 2 ** 20:>10.1f} {fused_peak / 2 ** 20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Stage-level benchmark of the synthesis pipeline, fully offline.
+
+Times dialect substitution, fetch, decode, punctuation processing and
+sentence assembly, time stretch, gain/articulation math and WAV encoding
+separately for generate_basic_speech and generate_punctuated_speech style
+requests. The offline backend stands in for gTTS. Results are written as JSON
+and can be compared with a stored baseline; any regression beyond the
+tolerance makes the script exit with status 1.
+
+    python benchmarks/bench_pipeline.py --output bench.json
+    python benchmarks/bench_pipeline.py --sizes word sentence --save-baseline baseline.json
+    python benchmarks/bench_pipeline.py --baseline baseline.json --tolerance 0.25
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import OfflineBackend
+from marathi_tts import MarathiTTS
+
+PARAGRAPH = (
+    "आज सकाळी मी बाजारात गेलो आणि ताज्या भाज्या आणल्या. "
+    "तुला काय पाहिजे, मला सांग? आपण संध्याकाळी नदीकाठी फिरायला जाऊ! "
+    "पाऊस नाही आला तर शेतात काम करावे लागेल; नाहीतर घरीच थांबू. "
+    "तो खूप छान बोलतो आणि सगळ्यांना मदत करतो. "
+)
+PAGE_CHARS = 1800
+
+SIZES = {
+    'word': "नमस्कार",
+    'sentence': "तुला काय पाहिजे, मला सांग?",
+    'paragraph': PARAGRAPH,
+    'page': PARAGRAPH * (PAGE_CHARS // len(PARAGRAPH) + 1),
+    '50pages': PARAGRAPH * (50 * PAGE_CHARS // len(PARAGRAPH) + 1),
+}
+
+
+class StageTimer:
+    """Collects wall-clock time per named stage for one request"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def run_basic(tts, text, dialect, emotion, timer):
+    backend = tts.backend
+    with timer.stage('dialect'):
+        modified_text = tts.dialects[dialect].apply_dialect(text)
+    with timer.stage('fetch'):
+        payload = backend.fetch(modified_text)
+    with timer.stage('decode'):
+        audio_data, sample_rate = backend.decode(payload)
+    return process(tts, audio_data, sample_rate, tts.effect_chain(dialect, emotion), timer)
+
+
+def run_punctuated(tts, text, dialect, timer):
+    backend = tts.backend
+    dialect_obj = tts.dialects[dialect]
+    with timer.stage('dialect'):
+        sentences = tts.split_sentences(text)
+        modified = [dialect_obj.apply_dialect(sentence) for sentence in sentences]
+    with timer.stage('fetch'):
+        payloads = [backend.fetch(sentence) for sentence in modified]
+    with timer.stage('decode'):
+        decoded = [backend.decode(payload) for payload in payloads]
+    with timer.stage('punctuation'):
+        pieces = [(sentence, audio, rate) for sentence, (audio, rate) in zip(sentences, decoded)]
+        audio_data, sample_rate = tts.assemble_sentences(pieces)
+    return process(tts, audio_data, sample_rate, tts.effect_chain(dialect), timer)
+
+
+def process(tts, audio_data, sample_rate, chain, timer):
+    with timer.stage('rhythm'):
+        stretched = chain.stretch(audio_data)
+    with timer.stage('effects'):
+        processed = chain.apply_gain(stretched)
+    with timer.stage('encode'):
+        buffer = io.BytesIO()
+        sf.write(buffer, processed, sample_rate, format='WAV')
+    return len(processed) / sample_rate
+
+
+def run_request(tts, text, dialect, emotion):
+    timer = StageTimer()
+    start = time.perf_counter()
+    if emotion == 'punctuation':
+        audio_seconds = run_punctuated(tts, text, dialect, timer)
+    else:
+        audio_seconds = run_basic(tts, text, dialect, emotion, timer)
+    return time.perf_counter() - start, timer.timings, audio_seconds
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1e3
+
+
+def measure(tts, text, dialect, emotion, repeat):
+    totals, stages = [], {}
+    audio_seconds = 0.0
+    for _ in range(repeat):
+        total, timings, audio_seconds = run_request(tts, text, dialect, emotion)
+        totals.append(total)
+        for name, value in timings.items():
+            stages.setdefault(name, []).append(value)
+
+    # Allocation tracing slows everything down, so peak memory gets its own run
+    tracemalloc.start()
+    run_request(tts, text, dialect, emotion)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = float(np.median(totals))
+    return {
+        'chars': len(text),
+        'audio_seconds': audio_seconds,
+        'total': {'p50_ms': percentile(totals, 50), 'p95_ms': percentile(totals, 95),
+                  'p99_ms': percentile(totals, 99)},
+        'stages': {name: {'p50_ms': percentile(values, 50), 'p95_ms': percentile(values, 95)}
+                   for name, values in stages.items()},
+        'chars_per_s': len(text) / median,
+        'audio_s_per_s': audio_seconds / median,
+        'peak_mb': peak / 2 ** 20,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regressions of results against a baseline"""
+    regressions = []
+    limit = 1.0 + tolerance
+    for key, base in baseline.get('results', {}).items():
+        current = results.get(key)
+        if current is None:
+            continue
+        for q in ('p50_ms', 'p99_ms'):
+            if current['total'][q] > base['total'][q] * limit:
+                regressions.append(f"{key}: {q} {base['total'][q]:.1f} -> {current['total'][q]:.1f}")
+        if current['audio_s_per_s'] * limit < base['audio_s_per_s']:
+            regressions.append(f"{key}: throughput {base['audio_s_per_s']:.1f} -> "
+                               f"{current['audio_s_per_s']:.1f} audio-s/s")
+        if current['peak_mb'] > base['peak_mb'] * limit:
+            regressions.append(f"{key}: peak {base['peak_mb']:.1f} -> {current['peak_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--dialects', nargs='+', default=None, help="default: all dialects")
+    parser.add_argument('--emotions', nargs='+', default=None, help="default: all emotions")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="compare against this results JSON")
+    parser.add_argument('--save-baseline', help="write results JSON as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    tts = MarathiTTS(use_cache=False, backend=OfflineBackend())
+    dialects = args.dialects or list(tts.dialects)
+    emotions = args.emotions or list(tts.emotion_modifier.emotions)
+
+    results = {}
+    for size in args.sizes:
+        for dialect in dialects:
+            for emotion in emotions:
+                key = f"{size}/{dialect}/{emotion}"
+                result = measure(tts, SIZES[size], dialect, emotion, args.repeat)
+                results[key] = result
+                stages = ' '.join(f"{name}={value['p50_ms']:.1f}" for name, value in result['stages'].items())
+                print(f"{key:<32} p50 {result['total']['p50_ms']:>9.1f} ms  "
+                      f"{result['audio_s_per_s']:>8.1f} audio-s/s  {result['peak_mb']:>7.1f} MB  [{stages}]")
+
+    report = {
+        'meta': {'python': platform.python_version(), 'numpy': np.__version__,
+                 'machine': platform.machine(), 'repeat': args.repeat},
+        'results': results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nno regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark: WSOLA time stretch vs the old scipy.signal.resample in change_rhythm.
+
+Inputs are noise of prime length, the worst case for FFT-based resampling.
+scipy is only needed here, not by the engine (pip install scipy). Run from
+the repository root:
+
+    python benchmarks/bench_rhythm.py --durations 1 60 1800 --rate 1.12
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from scipy import signal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from time_stretch import time_stretch
+
+SAMPLE_RATE = 24000  # gTTS decodes to 24 kHz mono
+
+
+def is_prime(n):
+    if n < 2 or n % 2 == 0:
+        return n == 2
+    i = 3
+    while i * i <= n:
+        if n % i == 0:
+            return False
+        i += 2
+    return True
+
+
+def prime_length(seconds):
+    n = int(seconds * SAMPLE_RATE)
+    while not is_prime(n):
+        n += 1
+    return n
+
+
+def legacy_rhythm(audio_data, rate):
+    return signal.resample(audio_data, int(len(audio_data) / rate))
+
+
+def measure(func, audio_data, rate):
+    """Return (seconds, peak traced bytes); tracing slows allocation, so it gets its own run"""
+    start = time.perf_counter()
+    func(audio_data, rate)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(audio_data, rate)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--durations', type=float, nargs='+', default=[1, 60, 1800],
+                        help="input lengths in seconds")
+    parser.add_argument('--rate', type=float, default=1.12, help="rhythm factor (1.12 is Ahirani/Nagpuri)")
+    parser.add_argument('--skip-legacy-above', type=float, default=None,
+                        help="skip scipy.signal.resample for inputs longer than this many seconds")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'input':>10} {'samples':>11} {'method':>8} {'time (s)':>9} {'ns/sample':>10} {'peak MB':>8}")
+    for seconds in args.durations:
+        length = prime_length(seconds)
+        audio_data = (0.1 * rng.standard_normal(length)).astype(np.float32)
+        methods = [('wsola', time_stretch)]
+        if args.skip_legacy_above is None or seconds <= args.skip_legacy_above:
+            # The old path decoded with sf.read, which returns float64
+            methods.append(('resample', lambda a, r: legacy_rhythm(a.astype(np.float64), r)))
+        for name, func in methods:
+            elapsed, peak = measure(func, audio_data, args.rate)
+            print(f"{seconds:>9.0f}s {length:>11,} {name:>8} {elapsed:>9.3f} "
+                  f"{elapsed / length * 1e9:>10.1f} {peak / 2 ** 20:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark: cold-start latency of the headless engine and of the GUI module.
+
+Every sample runs in a fresh interpreter, so nothing is cached in sys.modules.
+Run from the repository root:
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['customtkinter', 'tkinter', 'scipy', 'sounddevice', 'gtts']
+
+# Each snippet prints the elapsed seconds and which heavy modules were loaded
+SCENARIOS = {
+    'engine import': "import marathi_tts",
+    'engine startup': "import marathi_tts; marathi_tts.MarathiTTS(use_cache=False)",
+    'gui import': "import project",
+}
+
+TEMPLATE = """
+import json, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def run_once(code):
+    script = TEMPLATE.format(code=code, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'scenario':<16} {'median ms':>10} {'min ms':>8}  heavy modules loaded")
+    for name, code in SCENARIOS.items():
+        try:
+            samples = [run_once(code) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name:<16} {'failed':>10}  {e}")
+            continue
+        timings = [sample['elapsed'] * 1e3 for sample in samples]
+        loaded = ', '.join(samples[-1]['loaded']) or '-'
+        print(f"{name:<16} {statistics.median(timings):>10.1f} {min(timings):>8.1f}  {loaded}")
+
+
+if __name__ == '__main__':
+    main()
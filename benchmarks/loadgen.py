@@ -0,0 +1,113 @@
+"""Load generator for service.py: latency percentiles and throughput.
+
+Each of --concurrency clients keeps one HTTP/1.1 connection open and sends
+requests back to back until --requests have been made. Texts are drawn from
+--distinct variants of a sentence, so lowering it exercises request
+coalescing and the synthesis cache. Start the service first, e.g.:
+
+    python service.py --offline --port 8080
+    python benchmarks/loadgen.py --url http://127.0.0.1:8080 --concurrency 32 --requests 1000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+import numpy as np
+
+BASE_TEXT = "तुमचा अर्ज क्रमांक {n} आम्हाला मिळाला आहे. धन्यवाद!"
+
+
+async def read_response(reader):
+    """Return (status, body, time to first body byte) for one HTTP/1.1 response"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    first_byte = None
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            if first_byte is None:
+                first_byte = time.perf_counter()
+            if size == 0:
+                await reader.readline()
+                break
+            body += await reader.readexactly(size)
+            await reader.readline()
+        return status, bytes(body), first_byte
+    body = await reader.readexactly(int(headers.get('content-length') or 0))
+    return status, body, time.perf_counter()
+
+
+async def client(host, port, path, payloads, remaining, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while remaining:
+            remaining.pop()
+            body = json.dumps(random.choice(payloads), ensure_ascii=False).encode('utf-8')
+            start = time.perf_counter()
+            writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body)
+            await writer.drain()
+            status, data, first_byte = await read_response(reader)
+            results.append((status, time.perf_counter() - start, first_byte - start, len(data)))
+    finally:
+        writer.close()
+
+
+async def run(args):
+    url = urlsplit(args.url)
+    payloads = [{'text': BASE_TEXT.format(n=n), 'dialect': args.dialect, 'emotion': args.emotion}
+                for n in range(args.distinct)]
+    remaining = list(range(args.requests))
+    results = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(url.hostname, url.port or 80, f"/{args.endpoint}", payloads, remaining, results)
+                           for _ in range(args.concurrency)))
+    return results, time.perf_counter() - start
+
+
+def percentiles(values):
+    return ' '.join(f"p{q} {np.percentile(values, q) * 1e3:8.1f} ms" for q in (50, 90, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--endpoint', choices=['synthesize', 'stream'], default='synthesize')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--distinct', type=int, default=50, help="number of different texts")
+    parser.add_argument('--dialect', default='standard')
+    parser.add_argument('--emotion', default='neutral')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    results, elapsed = asyncio.run(run(args))
+    statuses = Counter(status for status, _, _, _ in results)
+    ok = [result for result in results if result[0] == 200]
+    print(f"{len(results)} requests in {elapsed:.2f}s: {len(results) / elapsed:.1f} req/s, "
+          f"{len(ok) / elapsed:.1f} ok/s, statuses {dict(sorted(statuses.items()))}")
+    if ok:
+        print(f"latency      {percentiles([latency for _, latency, _, _ in ok])}")
+        if args.endpoint == 'stream':
+            print(f"first chunk  {percentiles([first for _, _, first, _ in ok])}")
+        print(f"mean response {np.mean([size for _, _, _, size in ok]) / 1024:.1f} KiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""Streaming output stage: sample-rate conversion, dithering and encoding.
+
+Audio is pushed block by block through ``StreamingEncoder``, which converts
+the rate with a polyphase windowed-sinc filter, quantizes to 16 bits with TPDF
+dither for PCM containers and appends to an open ``soundfile.SoundFile``. No
+stage needs the whole signal, so long outputs are never held twice.
+"""
+import io
+import os
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+
+# Container and subtype per file extension
+FORMATS = {
+    '.wav': ('WAV', 'PCM_16'),
+    '.flac': ('FLAC', 'PCM_16'),
+    '.ogg': ('OGG', 'VORBIS'),
+    '.opus': ('OGG', 'OPUS'),
+}
+
+# Rates libsndfile accepts for Opus
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+class StreamingResampler:
+    """Polyphase rational resampler that keeps its filter state between blocks.
+
+    The rate ratio is reduced to ``up / down`` and a Kaiser-windowed sinc
+    low-pass with ``zero_crossings`` lobes per side is split into ``up``
+    phases, so every output sample costs one short dot product. Output
+    sample ``k`` is centred on input time ``k * in_rate / out_rate``, so
+    there is no delay to compensate; ``flush()`` drains the filter tail.
+    Input is consumed ``block_frames`` at a time and output computed in
+    slices of at most ``block_frames``, so working memory does not grow with
+    the size of the blocks passed in.
+    """
+
+    def __init__(self, in_rate, out_rate, zero_crossings=16, rolloff=0.95, beta=8.6, block_frames=65536):
+        divisor = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // divisor
+        self.down = int(in_rate) // divisor
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.block_frames = block_frames
+
+        factor = max(self.up, self.down)
+        self.half = zero_crossings * factor
+        n = np.arange(-self.half, self.half + 1)
+        cutoff = rolloff / factor
+        taps = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), beta)
+        taps /= taps.sum()
+        # phases[p, j] is the tap applied to input sample n0 - j at phase p
+        self.taps_per_phase = -(-len(taps) // self.up)
+        padded = np.zeros(self.taps_per_phase * self.up)
+        padded[:len(taps)] = taps * self.up
+        self.phases = padded.reshape(self.taps_per_phase, self.up).T.astype(np.float32)
+
+        # Input buffer starts with zeros standing in for samples before the signal
+        self._buffer = None
+        self._start = -self.taps_per_phase
+        self._received = 0
+        self._next = 0
+
+    def process(self, block):
+        """Consume a block of input samples and return the output that is final so far"""
+        block = np.asarray(block, dtype=np.float32)
+        if self.up == self.down:
+            return block
+        if self._buffer is None:
+            self._buffer = np.zeros((self.taps_per_phase,) + block.shape[1:], dtype=np.float32)
+        out = []
+        for start in range(0, len(block), self.block_frames):
+            self._buffer = np.concatenate((self._buffer, block[start:start + self.block_frames]))
+            self._received += len(block[start:start + self.block_frames])
+            # Output k needs input up to (k * down + half) // up
+            last = (self.up * self._received - 1 - self.half) // self.down
+            out.append(self._emit(last + 1))
+        return self._join(out)
+
+    def flush(self):
+        """Finish the stream and return the remaining output"""
+        if self.up == self.down or self._buffer is None:
+            return np.zeros(0, dtype=np.float32)
+        tail = -(-self.half // self.up) + 1
+        self._buffer = np.concatenate((self._buffer, np.zeros((tail,) + self._buffer.shape[1:], dtype=np.float32)))
+        total = -(-self._received * self.up // self.down)
+        return self._emit(total)
+
+    def _join(self, parts):
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return np.zeros((0,) + self._buffer.shape[1:], dtype=np.float32)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def _emit(self, end):
+        # The gather below is slice x taps_per_phase, so large ranges go in slices
+        return self._join([self._emit_slice(min(start + self.block_frames, end))
+                           for start in range(self._next, end, self.block_frames)])
+
+    def _emit_slice(self, end):
+        k = np.arange(self._next, end)
+        position = k * self.down + self.half
+        newest = position // self.up - self._start
+        frames = self._buffer[newest[:, None] - np.arange(self.taps_per_phase)]
+        weights = self.phases[position % self.up]
+        if frames.ndim == 2:
+            out = np.einsum('kt,kt->k', weights, frames)
+        else:
+            out = np.einsum('kt,ktc->kc', weights, frames)
+        self._next = end
+
+        # Keep only the input that later outputs can still reach
+        oldest = (self._next * self.down + self.half) // self.up - (self.taps_per_phase - 1)
+        if oldest > self._start:
+            self._buffer = self._buffer[oldest - self._start:]
+            self._start = oldest
+        return out.astype(np.float32)
+
+
+def dither_to_pcm16(audio_data, rng):
+    """Quantize float audio to int16 with triangular (TPDF) dither of one LSB"""
+    noise = rng.random(audio_data.shape, dtype=np.float32) - rng.random(audio_data.shape, dtype=np.float32)
+    scaled = np.asarray(audio_data, dtype=np.float32) * 32767 + noise
+    return np.clip(np.rint(scaled), -32768, 32767).astype(np.int16)
+
+
+def output_format(path, format=None, subtype=None):
+    """Return the (format, subtype) used for path, from its extension unless given"""
+    if format is None:
+        ext = os.path.splitext(path)[1].lower() if isinstance(path, str) else '.wav'
+        if ext not in FORMATS:
+            raise ValueError(f"Unsupported output format '{ext}'")
+        format, default_subtype = FORMATS[ext]
+        subtype = subtype or default_subtype
+    return format.upper(), subtype or sf.default_subtype(format)
+
+
+class StreamingEncoder:
+    """Resample, dither and encode audio into a file or file object, block by block.
+
+    ``out_rate`` defaults to the input rate; Opus output is moved to the
+    nearest rate it supports. ``mono`` averages the channels. PCM outputs are
+    quantized to 16 bits with TPDF dither; lossy codecs get the float signal.
+    """
+
+    def __init__(self, file, sample_rate, channels=1, out_rate=None, format=None, subtype=None,
+                 mono=False, dither=True, seed=None):
+        self.format, self.subtype = output_format(file, format, subtype)
+        out_rate = int(out_rate or sample_rate)
+        if self.subtype == 'OPUS' and out_rate not in OPUS_RATES:
+            out_rate = min((rate for rate in OPUS_RATES if rate >= out_rate), default=OPUS_RATES[-1])
+        self.sample_rate = out_rate
+        self.mono = mono and channels > 1
+        self.channels = 1 if self.mono else channels
+        self.resampler = StreamingResampler(sample_rate, out_rate) if out_rate != sample_rate else None
+        self.dither = dither and self.subtype.startswith('PCM')
+        self._rng = np.random.default_rng(seed)
+        self.frames = 0
+        self._file = sf.SoundFile(file, 'w', samplerate=out_rate, channels=self.channels,
+                                  format=self.format, subtype=self.subtype)
+
+    def write(self, block):
+        """Encode one block of float audio at the input rate"""
+        block = np.asarray(block, dtype=np.float32)
+        if self.mono:
+            block = block.mean(axis=1)
+        if self.resampler is not None:
+            block = self.resampler.process(block)
+        self._write(block)
+
+    def close(self):
+        """Flush the resampler and finish the container"""
+        if self._file.closed:
+            return
+        if self.resampler is not None:
+            self._write(self.resampler.flush())
+        self._file.close()
+
+    def _write(self, block):
+        if not len(block):
+            return
+        if self.dither:
+            block = dither_to_pcm16(block, self._rng)
+        else:
+            block = np.clip(block, -1.0, 1.0)
+        self._file.write(block)
+        self.frames += len(block)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_audio(file, audio_data, sample_rate, out_rate=None, format=None, subtype=None, mono=False,
+                block_frames=65536):
+    """Encode a complete array through StreamingEncoder; returns the output rate"""
+    channels = 1 if np.ndim(audio_data) == 1 else audio_data.shape[1]
+    with StreamingEncoder(file, sample_rate, channels, out_rate, format, subtype, mono) as encoder:
+        for start in range(0, len(audio_data), block_frames):
+            encoder.write(audio_data[start:start + block_frames])
+    return encoder.sample_rate
+
+
+def encode_bytes(audio_data, sample_rate, format='wav', out_rate=None, mono=False):
+    """Return audio encoded as bytes in the container named by format (wav, flac, ogg, opus)"""
+    ext = '.' + format.lower().lstrip('.')
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported output format '{format}'")
+    container, subtype = FORMATS[ext]
+    buffer = io.BytesIO()
+    write_audio(buffer, audio_data, sample_rate, out_rate, container, subtype, mono)
+    return buffer.getvalue()
@@ -0,0 +1,1009 @@
+# Headless synthesis core: dialects, emotions, DSP and the MarathiTTS engine.
+# Only numpy and soundfile are imported up front; gTTS and sounddevice are
+# imported on first use so workers and servers start quickly.
+import os
+import re
+import shutil
+import time
+import queue
+from threading import Thread, Event, Lock
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import soundfile as sf
+from audio_cache import AudioCache
+from backends import GTTSBackend
+from encoders import StreamingEncoder, write_audio
+from metrics import Metrics
+from time_stretch import time_stretch, time_stretch_batch
+
+# A sentence is a run of text up to and including its punctuation, or the unpunctuated tail
+SENTENCE_PATTERN = re.compile(r'[^।?!.,;:"\']+(?:[।?!.,;:"\']+|$)')
+
+# Punctuation modulation: questions get louder, exclamations faster and
+# other sentences slightly quieter
+QUESTION_GAIN = 10 ** (10.0 / 20)
+STATEMENT_GAIN = 10 ** (-5.0 / 20)
+EXCLAMATION_SPEED = 1.3
+
+# Silence between sentences in seconds, scaled by the emotion's pause_length
+SENTENCE_PAUSE = 0.2
+
+# Long-document mode sends at most this many characters per request, gTTS's own limit
+LONG_CHUNK_CHARS = 100
+
+def punctuation_rule(sentence):
+    """Return the (gain, speed) for a sentence from its final punctuation mark"""
+    last_char = sentence.strip()[-1] if sentence.strip() else ''
+    if last_char == '?':
+        return QUESTION_GAIN, 1.0
+    if last_char == '!':
+        return 1.0, EXCLAMATION_SPEED
+    return STATEMENT_GAIN, 1.0
+
+def _split_words(sentence, max_chars):
+    """Cut an overlong sentence between words into parts of at most max_chars"""
+    parts, current = [], ''
+    for word in re.findall(r'\S+\s*', sentence):
+        if current and len(current) + len(word) > max_chars:
+            parts.append(current)
+            current = ''
+        while len(word) > max_chars:
+            parts.append(word[:max_chars])
+            word = word[max_chars:]
+        current += word
+    if current:
+        parts.append(current)
+    return parts
+
+class _StreamPlayer:
+    """Bounded chunk queue drained by a sounddevice output callback.
+
+    Chunks are copied back to back into the device buffer, so consecutive
+    sentences join without gaps as long as synthesis keeps ahead of playback.
+    """
+    def __init__(self, max_chunks):
+        self.queue = queue.Queue(maxsize=max_chunks)
+        self.finished = Event()
+        self.first_audio_time = None
+        self._current = None
+        self._offset = 0
+        self._closed = False
+        self.aborted = False
+
+    def feed(self, chunk):
+        """Queue a chunk, waiting for space; returns False once playback has ended"""
+        chunk = chunk.reshape(len(chunk), -1)
+        while not self.finished.is_set():
+            try:
+                self.queue.put(chunk, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self):
+        """Mark the end of the stream; playback stops after the queued audio"""
+        while not self.finished.is_set():
+            try:
+                self.queue.put(None, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def abort(self):
+        """End playback at the next callback without playing the queued audio; thread-safe"""
+        self.aborted = True
+        self.finished.set()
+
+    def callback(self, outdata, frames, time_info, status):
+        if self.aborted:
+            import sounddevice as sd
+            outdata[:] = 0
+            raise sd.CallbackAbort
+        written = 0
+        while written < frames and not self._closed:
+            if self._current is None or self._offset >= len(self._current):
+                try:
+                    self._current = self.queue.get_nowait()
+                except queue.Empty:
+                    break  # Underrun: pad with silence until synthesis catches up
+                self._offset = 0
+                if self._current is None:
+                    self._closed = True
+                    break
+            count = min(frames - written, len(self._current) - self._offset)
+            outdata[written:written + count] = self._current[self._offset:self._offset + count]
+            self._offset += count
+            written += count
+        outdata[written:] = 0
+        if written and self.first_audio_time is None:
+            self.first_audio_time = time.perf_counter()
+        if self._closed:
+            import sounddevice as sd
+            raise sd.CallbackStop
+
+class SpeechResult:
+    """Audio produced for one request, independent of the engine's current_* state"""
+    def __init__(self, text, dialect, emotion, audio_data, sample_rate):
+        self.text = text
+        self.dialect = dialect
+        self.emotion = emotion
+        self.audio_data = audio_data
+        self.sample_rate = sample_rate
+        # Set by speak() once the first sample reached the output device
+        self.time_to_first_audio = None
+
+    @property
+    def duration(self):
+        return len(self.audio_data) / self.sample_rate
+
+    def save(self, path, sample_rate=None, mono=False):
+        """Write the audio to path; the extension picks WAV, FLAC, OGG or OPUS"""
+        try:
+            write_audio(path, self.audio_data, self.sample_rate, sample_rate, mono=mono)
+            return True
+        except Exception as e:
+            print(f"Error saving audio: {str(e)}")
+            return False
+
+class MarathiDialect:
+    def __init__(self, name, substitutions, rhythm_pattern=1.0, articulation=1.0, style='neutral'):
+        self.name = name
+        self.substitutions = substitutions
+        self.rhythm_pattern = rhythm_pattern
+        self.articulation = articulation
+        self.style = style
+        self._compile()
+
+    def _compile(self):
+        """Compile the substitution table into a single longest-match-first regex"""
+        # Identity rules never change the text, so they are dropped
+        self._rules = {original: replacement for original, replacement in self.substitutions.items()
+                       if original and original != replacement}
+        if not self._rules:
+            self._pattern = None
+            return
+        # re tries alternatives left to right, so longer keys must come first
+        keys = sorted(self._rules, key=len, reverse=True)
+        self._pattern = re.compile('(' + '|'.join(re.escape(key) for key in keys) + ')')
+
+    def apply_dialect(self, text):
+        """Apply dialect-specific substitutions to text in a single pass"""
+        if self._pattern is None:
+            return text
+        # split() with a capturing group puts every match at an odd index
+        parts = self._pattern.split(text)
+        parts[1::2] = map(self._rules.__getitem__, parts[1::2])
+        return ''.join(parts)
+
+class EmotionModifier:
+    def __init__(self):
+        # Emotion parameters with built-in speed and volume adjustments
+        self.emotions = {
+            'neutral': {'intensity': 1.0, 'speed_factor': 1.0, 'volume': 0.9, 'pause_length': 1.0},
+            'happy': {'intensity': 1.15, 'speed_factor': 1.1, 'volume': 1.1, 'pause_length': 0.8},
+            'angry': {'intensity': 1.8, 'speed_factor': -1.13, 'volume': 1.8, 'pause_length': 0.25},
+            'sad': {'intensity': 0.8, 'speed_factor': 0.89, 'volume': 0.7, 'pause_length': 1.4},
+            'punctuation': {'intensity': 1.0, 'speed_factor': 1.2, 'volume': 1.7, 'pause_length': 1.0}
+        }
+
+    def modify_audio(self, audio_data, emotion='neutral'):
+        params = self.emotions[emotion]
+        modified = audio_data.copy()
+        
+        # Apply intensity
+        if params['intensity'] != 1.0:
+            modified = self.change_intensity(modified, params['intensity'])
+            
+        # Handle speed factor (convert negative to appropriate positive value)
+        if params['speed_factor'] != 1.0:
+            modified = self.change_rhythm(modified, self.speed_rate(emotion))
+            
+        # Apply volume
+        modified = modified * params['volume']
+        return modified
+
+    def change_intensity(self, audio_data, intensity_factor):
+        """Change articulation intensity without affecting base tone"""
+        mean_val = np.mean(audio_data)
+        modified = mean_val + (audio_data - mean_val) * intensity_factor
+        return modified
+
+    def change_rhythm(self, audio_data, rhythm_factor):
+        """Change speech rhythm/speed without affecting tone"""
+        if rhythm_factor <= 0:
+            rhythm_factor = 1.0
+        if rhythm_factor == 1.0:
+            return audio_data
+        # WSOLA keeps the pitch and works block by block on bounded memory
+        return time_stretch(audio_data, rhythm_factor)
+
+    def speed_rate(self, emotion):
+        """Return the emotion's speed_factor as a positive rhythm factor"""
+        speed_factor = self.emotions[emotion]['speed_factor']
+        return abs(speed_factor) if speed_factor > 0 else (1 / abs(speed_factor))
+
+class EffectChain:
+    """Dialect and emotion post-processing compiled into a single float32 pass.
+
+    Articulation and intensity both scale around the mean and volume is a plain
+    gain, so together they reduce to ``x * gain + mean * (volume - gain)``. The
+    dialect rhythm and the emotion speed are merged into one time stretch.
+    """
+    def __init__(self, rate=1.0, articulation=1.0, intensity=1.0, volume=1.0, ceiling=0.99):
+        self.rate = rate if rate > 0 else 1.0
+        self.gain = articulation * intensity * volume
+        self.offset_scale = volume - self.gain
+        self.ceiling = ceiling
+
+    def apply(self, audio_data):
+        """Return a processed float32 copy of audio_data"""
+        return self.apply_gain(self.stretch(audio_data))
+
+    def stretch(self, audio_data):
+        """Time-stretch stage; always returns a new float32 array"""
+        if self.rate != 1.0:
+            return time_stretch(np.asarray(audio_data, dtype=np.float32), self.rate)
+        return np.array(audio_data, dtype=np.float32)
+
+    def apply_batch(self, audios):
+        """Process many mono utterances at once; returns a list of float32 arrays.
+
+        The utterances are zero-padded into one 2-D array, so the time stretch
+        and the gain stage run across all of them in lockstep. Each output
+        matches apply() on that utterance.
+        """
+        if any(np.ndim(audio) != 1 for audio in audios):
+            return [self.apply(audio) for audio in audios]
+        lengths = np.array([len(audio) for audio in audios], dtype=np.int64)
+        batch = np.zeros((len(audios), lengths.max(initial=0)), dtype=np.float32)
+        for row, audio in zip(batch, audios):
+            row[:len(audio)] = audio
+        if self.rate != 1.0:
+            batch, lengths = time_stretch_batch(batch, lengths, self.rate)
+
+        # Same affine gain as apply_gain, with one mean per row; padding is zero
+        if self.offset_scale:
+            offsets = batch.sum(axis=1) / np.maximum(lengths, 1) * self.offset_scale
+            batch *= self.gain
+            batch += offsets[:, None].astype(np.float32)
+        elif self.gain != 1.0:
+            batch *= self.gain
+        np.clip(batch, -self.ceiling, self.ceiling, out=batch)
+        return [batch[row, :length].copy() for row, length in enumerate(lengths)]
+
+    def apply_gain(self, audio):
+        """Affine gain stage with clipping, in place on a float32 array"""
+        if self.offset_scale:
+            offset = float(np.mean(audio)) * self.offset_scale
+            audio *= self.gain
+            audio += offset
+        elif self.gain != 1.0:
+            audio *= self.gain
+
+        # Clipping protection: keep the peak just inside full scale
+        np.clip(audio, -self.ceiling, self.ceiling, out=audio)
+        return audio
+
+class MarathiTTS:
+    def __init__(self, cache_dir=None, use_cache=True, fetch_workers=4, fetch_timeout=15, fetch_retries=2,
+                 backend=None, metrics=None):
+        self.emotion_modifier = EmotionModifier()
+        # Speech synthesizer; gTTS unless another backend (e.g. OfflineBackend) is given
+        self.backend = backend if backend is not None else GTTSBackend(timeout=fetch_timeout, retries=fetch_retries)
+        # Decoded synthesis results keyed on dialect-transformed text
+        self.cache = AudioCache(cache_dir) if use_cache else None
+        # Sentence fetches are network bound, so they run on a small thread pool
+        self.fetch_workers = fetch_workers
+        # Instrumentation is off unless a Metrics object is passed in
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        
+        # Dialect definitions
+        self.dialects = {
+            'standard': MarathiDialect('मानक मराठी', {}, 1.0, 1.0),
+            'varhadi': MarathiDialect('वरहाडी', {
+                'गा': 'मा', 'ळ': 'ल', 'आहे': 'आय', 'नाही': 'नाय',
+                'काय': 'काय', 'मी': 'म्ही', 'तू': 'तु',
+                'आपण': 'आपुण', 'झाला': 'झाला',
+                'पाहिजे': 'पाहिजे', 'बोलतो': 'बोलतो'
+            }, 1.1, 1.15),
+            'ahirani': MarathiDialect('अहिराणी', {
+                'आहे': 'हाय', 'नाही': 'नाय', 'मला': 'म्हाला',
+                'तुला': 'तुला', 'झाला': 'झालं',
+                'काय': 'काय', 'कसं': 'कसं',
+                'पाहिजे': 'पायजे', 'जातो': 'जातो'
+            }, 1.12, 1.2),
+            'malwani': MarathiDialect('मालवणी', {
+                'व': 'व्ह', 'च': 'च', 'झ': 'झ', 'आहे': 'आस',
+                'नाही': 'नाय', 'काय': 'काय',
+                'कसं': 'कसं', 'तुला': 'तुज्जा',
+                'मला': 'मज्जा', 'पाहिजे': 'पायजे'
+            }, 0.92, 0.9),
+            'nagpuri': MarathiDialect('नागपुरी', {
+                'आहे': 'हाय', 'नाही': 'नाय', 'मला': 'म्हाला',
+                'तुला': 'तुला', 'आपण': 'आपुण',
+                'काय': 'काय', 'करतो': 'करतो',
+                'बोलतो': 'बोलतो'
+            }, 1.12, 1.2),
+            'konkani': MarathiDialect('कोकणी', {
+                'आहे': 'आसा', 'नाही': 'ना', 'काय': 'कितं',
+                'कसं': 'कसं', 'तुला': 'तुका',
+                'मला': 'माका', 'पाहिजे': 'जाय'
+            }, 0.95, 0.93)
+        }
+        self._effect_chains = {}
+        # Streaming: processed sentences kept ahead, and chunks buffered for playback
+        self.stream_lookahead = 3
+        self.stream_buffer_chunks = 4
+        # Players currently feeding an output stream, so stop() can abort them all
+        self._players = set()
+        self._players_lock = Lock()
+        self.last_time_to_first_audio = None
+        self.current_audio_data = None
+        self.current_sample_rate = None
+        # Set instead of current_audio_data when the result only exists on disk
+        self.current_file = None
+        self.is_playing = False
+        # Rate of saved and written output; None keeps the synthesis rate
+        self.sample_rate = None
+
+    def generate_speech(self, text, dialect='standard', emotion='neutral', save_path=None):
+        with self.metrics.request(dialect=dialect, emotion=emotion, characters=len(text)) as event:
+            self.metrics.increment('characters', len(text))
+            try:
+                if emotion == 'punctuation':
+                    result = self.generate_punctuated_speech(text, dialect, save_path)
+                else:
+                    result = self.generate_basic_speech(text, dialect, emotion, save_path)
+            except Exception as e:
+                print(f"Error generating speech: {str(e)}")
+                result = None
+            if result is None:
+                event['error'] = "no audio generated"
+            else:
+                event['audio_seconds'] = len(result) / self.current_sample_rate
+            return result
+
+    def synthesize_speech(self, text, dialect='standard', emotion='neutral', token=None):
+        """Fetch and render text and return a SpeechResult, without touching engine state.
+
+        Safe to call from many threads at once. token (a scheduler.CancellationToken)
+        is checked before and between the stages; a cancelled request raises
+        JobCancelled instead of doing the remaining work. Errors propagate.
+        """
+        with self.metrics.request(dialect=dialect, emotion=emotion, characters=len(text), mode='job') as event:
+            self.metrics.increment('characters', len(text))
+            if token is not None:
+                token.raise_if_cancelled()
+            pieces = self.fetch(text, dialect, emotion)
+            if token is not None:
+                token.raise_if_cancelled()
+            audio_data, sample_rate = self.render(pieces, dialect, emotion)
+            event['audio_seconds'] = len(audio_data) / sample_rate
+            return SpeechResult(text, dialect, emotion, audio_data, sample_rate)
+
+    def synthesize(self, text, lang='mr', slow=False):
+        """Return decoded (audio_data, sample_rate) for dialect-transformed text, using the cache"""
+        if self.cache is not None:
+            cached = self.cache.get(text, lang, slow, self.backend.cache_namespace)
+            if cached is not None:
+                self.metrics.increment('cache_hits')
+                return cached
+            self.metrics.increment('cache_misses')
+        try:
+            with self.metrics.stage('backend'):
+                audio_data, sample_rate = self.backend.synthesize(text, lang, slow)
+        except Exception:
+            self.metrics.increment('backend_errors')
+            raise
+        if self.cache is None:
+            return audio_data, sample_rate
+        return self.cache.put(text, lang, slow, audio_data, sample_rate, self.backend.cache_namespace)
+
+    def synthesize_many(self, texts):
+        """Synthesize several texts concurrently and return the results in input order.
+
+        Each entry is a decoded (audio_data, sample_rate) pair, or None when that
+        text still failed after the backend's retries, so one bad sentence does not abort the rest.
+        """
+        unique_texts = list(dict.fromkeys(texts))
+        results = {}
+        workers = max(1, min(self.fetch_workers, len(unique_texts)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {text: pool.submit(self.synthesize, text) for text in unique_texts}
+            for index, text in enumerate(unique_texts):
+                try:
+                    results[text] = futures[text].result()
+                except Exception as e:
+                    print(f"Error generating sentence {index + 1}: {str(e)}")
+                    results[text] = None
+        return [results[text] for text in texts]
+
+    def cache_stats(self):
+        """Return hit/miss statistics of the synthesis cache"""
+        return self.cache.stats() if self.cache is not None else {}
+
+    def effect_chain(self, dialect='standard', emotion=None):
+        """Return the compiled post-processing chain for a dialect/emotion pair.
+
+        With emotion=None only the dialect stages are included, as used by the
+        punctuated path.
+        """
+        key = (dialect, emotion)
+        chain = self._effect_chains.get(key)
+        if chain is None:
+            dialect_obj = self.dialects[dialect]
+            rate = dialect_obj.rhythm_pattern
+            intensity = volume = 1.0
+            if emotion is not None:
+                params = self.emotion_modifier.emotions[emotion]
+                rate *= self.emotion_modifier.speed_rate(emotion)
+                intensity = params['intensity']
+                volume = params['volume']
+            chain = EffectChain(rate, dialect_obj.articulation, intensity, volume)
+            self._effect_chains[key] = chain
+        return chain
+
+    def process_batch(self, audios, dialect='standard', emotion='neutral', bucket_size=64):
+        """Run the dialect/emotion effect chain over many decoded utterances at once.
+
+        All utterances share one dialect and emotion. They are sorted by length
+        and processed bucket_size at a time with EffectChain.apply_batch(), so
+        little padding is wasted. Returns the processed arrays in input order.
+        """
+        chain = self.effect_chain(dialect, emotion)
+        order = sorted(range(len(audios)), key=lambda index: len(audios[index]))
+        results = [None] * len(audios)
+        for start in range(0, len(order), bucket_size):
+            bucket = order[start:start + bucket_size]
+            with self.metrics.stage('effects_batch'):
+                processed = chain.apply_batch([audios[index] for index in bucket])
+            for index, audio in zip(bucket, processed):
+                results[index] = audio
+        return results
+
+    def render_matrix(self, text, dialects=None, emotions=None, save_dir=None):
+        """Render text in every dialect x emotion combination, sharing work between cells.
+
+        Dialects that transform the text identically share one fetch, cells with
+        the same source audio and stretch rate share the time stretch, and cells
+        whose whole chain coincides share the output array. Returns
+        ({(dialect, emotion): (audio_data, sample_rate) or None}, report), where
+        report counts the fetch/stretch/effects work done against the naive
+        one-call-per-cell cost. With save_dir each cell is written to
+        <dialect>_<emotion>.wav there.
+        """
+        dialects = list(dialects or self.dialects)
+        emotions = list(emotions or self.emotion_modifier.emotions)
+        start = time.perf_counter()
+        with self.metrics.request(characters=len(text), mode='matrix', cells=len(dialects) * len(emotions)) as event:
+            self.metrics.increment('characters', len(text))
+            sentences = self.split_sentences(text)
+            punctuated = 'punctuation' in emotions
+            basic = any(emotion != 'punctuation' for emotion in emotions)
+
+            # Dialect stage: transformed text per dialect
+            with self.metrics.stage('dialect'):
+                transformed = {}
+                for dialect in dialects:
+                    dialect_obj = self.dialects[dialect]
+                    whole = dialect_obj.apply_dialect(text) if basic else None
+                    parts = tuple(dialect_obj.apply_dialect(sentence) for sentence in sentences) if punctuated else ()
+                    transformed[dialect] = (whole, parts)
+
+            # Network stage: each distinct string is fetched once
+            wanted = []
+            for whole, parts in transformed.values():
+                if whole is not None:
+                    wanted.append(whole)
+                wanted.extend(parts)
+            unique_texts = list(dict.fromkeys(wanted))
+            fetched = dict(zip(unique_texts, self.synthesize_many(unique_texts)))
+
+            sources = {}
+            stretched = {}
+            outputs = {}
+            results = {}
+            for dialect in dialects:
+                whole, parts = transformed[dialect]
+                for emotion in emotions:
+                    if emotion == 'punctuation':
+                        source_key = ('punctuation', parts)
+                        if source_key not in sources:
+                            pieces = [(sentence,) + tuple(fetched[part]) for sentence, part in zip(sentences, parts)
+                                      if fetched[part] is not None]
+                            with self.metrics.stage('punctuation'):
+                                sources[source_key] = self.assemble_sentences(pieces) if pieces else None
+                        chain = self.effect_chain(dialect)
+                    else:
+                        source_key = ('whole', whole)
+                        sources.setdefault(source_key, fetched[whole])
+                        chain = self.effect_chain(dialect, emotion)
+                    source = sources[source_key]
+                    if source is None:
+                        results[(dialect, emotion)] = None
+                        continue
+
+                    audio_data, sample_rate = source
+                    stretch_key = (source_key, chain.rate)
+                    if stretch_key not in stretched:
+                        with self.metrics.stage('rhythm'):
+                            stretched[stretch_key] = chain.stretch(audio_data)
+                    output_key = (stretch_key, chain.gain, chain.offset_scale, chain.ceiling)
+                    if output_key not in outputs:
+                        with self.metrics.stage('effects'):
+                            outputs[output_key] = chain.apply_gain(stretched[stretch_key].copy())
+                        self.metrics.increment('audio_seconds', len(outputs[output_key]) / sample_rate)
+                    results[(dialect, emotion)] = (outputs[output_key], sample_rate)
+
+            if save_dir:
+                os.makedirs(save_dir, exist_ok=True)
+                for (dialect, emotion), result in results.items():
+                    if result is not None:
+                        write_audio(os.path.join(save_dir, f"{dialect}_{emotion}.wav"), result[0], result[1],
+                                    self.sample_rate)
+
+            cells = len(dialects) * len(emotions)
+            per_cell_fetches = sum(len(sentences) if emotion == 'punctuation' else 1 for emotion in emotions)
+            report = {
+                'cells': cells,
+                'failed': sum(result is None for result in results.values()),
+                'fetches': {'naive': per_cell_fetches * len(dialects), 'done': len(unique_texts)},
+                'stretches': {'naive': cells, 'done': len(stretched)},
+                'effects': {'naive': cells, 'done': len(outputs)},
+                'seconds': time.perf_counter() - start,
+            }
+            event.update(report)
+            if report['failed'] == cells:
+                event['error'] = "no audio generated"
+            return results, report
+
+    def fetch(self, text, dialect='standard', emotion='neutral'):
+        """Network stage: return decoded (sentence, audio_data, sample_rate) pieces for text.
+
+        Punctuated speech is fetched sentence by sentence and failed sentences are
+        left out; every other emotion fetches the whole text as a single piece.
+        """
+        dialect_obj = self.dialects[dialect]
+        if emotion != 'punctuation':
+            with self.metrics.stage('dialect'):
+                modified_text = dialect_obj.apply_dialect(text)
+            audio_data, sample_rate = self.synthesize(modified_text)
+            return [(text, audio_data, sample_rate)]
+        
+        # Apply dialect to each sentence and fetch them concurrently, in order
+        sentences = self.split_sentences(text)
+        self.metrics.increment('sentences', len(sentences))
+        with self.metrics.stage('dialect'):
+            modified_sentences = [dialect_obj.apply_dialect(sentence) for sentence in sentences]
+        fetched = self.synthesize_many(modified_sentences)
+        # Failed sentences are reported by synthesize_many and skipped
+        return [(sentence,) + tuple(result) for sentence, result in zip(sentences, fetched) if result is not None]
+
+    def render(self, pieces, dialect='standard', emotion='neutral'):
+        """DSP stage: turn fetched pieces into the final (audio_data, sample_rate)"""
+        if not pieces:
+            raise Exception("No audio was generated")
+        if emotion != 'punctuation':
+            _, audio_data, sample_rate = pieces[0]
+            # Rhythm, articulation, emotion intensity/speed and volume in one chain
+            return self._run_chain(self.effect_chain(dialect, emotion), audio_data, sample_rate), sample_rate
+        
+        with self.metrics.stage('punctuation'):
+            audio_data, sample_rate = self.assemble_sentences(pieces, emotion)
+        
+        # Apply dialect's rhythm pattern and articulation
+        return self._run_chain(self.effect_chain(dialect), audio_data, sample_rate), sample_rate
+
+    def _run_chain(self, chain, audio_data, sample_rate):
+        """Apply an effect chain, timing its stretch and gain stages separately"""
+        with self.metrics.stage('rhythm'):
+            audio = chain.stretch(audio_data)
+        with self.metrics.stage('effects'):
+            audio = chain.apply_gain(audio)
+        self.metrics.increment('audio_seconds', len(audio) / sample_rate)
+        return audio
+
+    def generate_basic_speech(self, text, dialect='standard', emotion='neutral', save_path=None):
+        """Generate speech without punctuation-based modulation"""
+        try:
+            pieces = self.fetch(text, dialect, emotion)
+            modified_audio, sample_rate = self.render(pieces, dialect, emotion)
+            self.current_sample_rate = sample_rate
+            self.current_audio_data = modified_audio
+            self.current_file = None
+            
+            if save_path:
+                write_audio(save_path, modified_audio, sample_rate, self.sample_rate)
+            return modified_audio
+            
+        except Exception as e:
+            print(f"Error generating basic speech: {str(e)}")
+            return None
+
+    def generate_punctuated_speech(self, text, dialect='standard', save_path=None):
+        """Generate speech with punctuation-based modulation"""
+        try:
+            pieces = self.fetch(text, dialect, 'punctuation')
+            modified_audio, sample_rate = self.render(pieces, dialect, 'punctuation')
+            self.current_sample_rate = sample_rate
+            self.current_audio_data = modified_audio
+            self.current_file = None
+            
+            if save_path:
+                write_audio(save_path, modified_audio, sample_rate, self.sample_rate)
+            return modified_audio
+                
+        except Exception as e:
+            print(f"Error generating punctuated speech: {str(e)}")
+            return None
+
+    def split_sentences(self, text):
+        """Split text into non-empty sentences, keeping their punctuation"""
+        sentences = [sentence for sentence in SENTENCE_PATTERN.findall(text) if sentence.strip()]
+        if not sentences and text.strip():
+            sentences = [text]  # If no punctuation, treat as one sentence
+        return sentences
+
+    def pause_samples(self, emotion, sample_rate):
+        """Number of silent samples inserted between sentences for an emotion"""
+        return int(SENTENCE_PAUSE * self.emotion_modifier.emotions[emotion]['pause_length'] * sample_rate)
+
+    def assemble_sentences(self, pieces, emotion='punctuation'):
+        """Punctuate (sentence, audio_data, sample_rate) pieces and join them with pauses.
+
+        Output lengths are known up front, so the result is preallocated and
+        every sentence is written once into its own slice: time and memory
+        grow linearly with the length of the text.
+        """
+        sample_rate = pieces[0][2]
+        lengths = []
+        for sentence, audio_data, rate in pieces:
+            if rate != sample_rate:
+                raise Exception(f"Sentence sample rates differ ({rate} and {sample_rate})")
+            _, speed = punctuation_rule(sentence)
+            lengths.append(int(len(audio_data) / speed))
+        
+        pause = self.pause_samples(emotion, sample_rate)
+        total = sum(lengths) + pause * (len(pieces) - 1)
+        output = np.zeros((total,) + np.shape(pieces[0][1])[1:], dtype=np.float32)
+        position = 0
+        for (sentence, audio_data, _), length in zip(pieces, lengths):
+            self._apply_punctuation(audio_data, sentence, out=output[position:position + length])
+            position += length + pause
+        return output, sample_rate
+
+    def chunk_text(self, text, max_chars=LONG_CHUNK_CHARS, group=True):
+        """Cut text into (chunk, sentence) pairs with chunks of at most max_chars.
+
+        Cuts fall on sentence boundaries, or between words inside a sentence
+        that is longer than max_chars. With group=True consecutive sentences
+        share a chunk while they fit. sentence is the text whose final
+        punctuation mark applies to the chunk.
+        """
+        pieces = []
+        for sentence in self.split_sentences(text):
+            parts = [sentence] if len(sentence) <= max_chars else _split_words(sentence, max_chars)
+            for part in parts:
+                if group and pieces and len(pieces[-1][0]) + len(part) <= max_chars:
+                    merged = pieces[-1][0] + part
+                    pieces[-1] = (merged, merged)
+                else:
+                    pieces.append((part, sentence))
+        return pieces
+
+    def _apply_punctuation(self, audio_data, sentence, out=None):
+        """Apply punctuation-based modifications to one sentence's audio.
+
+        Returns a float32 array, written into out when it is given.
+        """
+        gain, speed = punctuation_rule(sentence)
+        audio_data = np.asarray(audio_data, dtype=np.float32)
+        if speed != 1.0:
+            # Speed up exclamations without changing their pitch
+            stretched = time_stretch(audio_data, speed)
+            if out is None:
+                return stretched
+            out[:] = stretched
+            return out
+        return np.multiply(audio_data, gain, out=out)
+
+    def _process_sentence(self, sentence, audio_data, sample_rate, dialect, emotion, pause=False):
+        """Run the post-processing for a single sentence of a stream.
+
+        With pause=True the sentence is preceded by the emotion's pause.
+        """
+        self.metrics.increment('sentences')
+        if emotion == 'punctuation':
+            with self.metrics.stage('punctuation'):
+                audio_data = self._apply_punctuation(audio_data, sentence)
+            chain = self.effect_chain(dialect)
+        else:
+            chain = self.effect_chain(dialect, emotion)
+        if pause:
+            silence = np.zeros((self.pause_samples(emotion, sample_rate),) + np.shape(audio_data)[1:], dtype=np.float32)
+            audio_data = np.concatenate([silence, audio_data])
+        return self._run_chain(chain, audio_data, sample_rate)
+
+    def stream_speech(self, text, dialect='standard', emotion='neutral', max_chars=None):
+        """Yield processed (audio_data, sample_rate) chunks, one per sentence, in order.
+
+        A background thread keeps up to fetch_workers sentence fetches in flight
+        and pushes processed sentences into a queue of at most stream_lookahead
+        chunks, so synthesis stays ahead of the consumer without running away.
+        With max_chars set, chunks come from chunk_text() instead; punctuated
+        speech still gets one chunk per sentence so each keeps its own mark.
+        """
+        if max_chars:
+            units = self.chunk_text(text, max_chars, group=emotion != 'punctuation')
+        else:
+            units = [(sentence, sentence) for sentence in self.split_sentences(text)]
+        dialect_obj = self.dialects[dialect]
+        ready = queue.Queue(maxsize=self.stream_lookahead)
+        stop = Event()
+        end_of_stream = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    ready.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def produce():
+            try:
+                with ThreadPoolExecutor(max_workers=max(1, self.fetch_workers)) as pool:
+                    remaining = iter(units)
+                    in_flight = deque()
+
+                    def submit_next():
+                        unit = next(remaining, None)
+                        if unit is not None:
+                            chunk, sentence = unit
+                            modified_chunk = dialect_obj.apply_dialect(chunk)
+                            in_flight.append((sentence, pool.submit(self.synthesize, modified_chunk)))
+
+                    for _ in range(max(1, self.fetch_workers)):
+                        submit_next()
+                    first = True
+                    while in_flight and not stop.is_set():
+                        sentence, future = in_flight.popleft()
+                        submit_next()
+                        try:
+                            audio_data, sample_rate = future.result()
+                            chunk = self._process_sentence(sentence, audio_data, sample_rate, dialect, emotion,
+                                                           pause=not first)
+                        except Exception as e:
+                            print(f"Error streaming sentence: {str(e)}")
+                            continue
+                        first = False
+                        put((chunk, sample_rate))
+            finally:
+                put(end_of_stream)
+
+        Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                item = ready.get()
+                if item is end_of_stream:
+                    break
+                yield item
+        finally:
+            stop.set()
+
+    def play_stream(self, text, dialect='standard', emotion='neutral', token=None):
+        """Play speech as it is synthesized, starting with the first sentence.
+
+        Returns the complete processed audio, which is also kept for save(), or
+        None if nothing could be synthesized. The delay between the call and the
+        first audible sample is stored in last_time_to_first_audio.
+        """
+        self.last_time_to_first_audio = None
+        try:
+            result = self.speak(text, dialect, emotion, token)
+        except Exception as e:
+            print(f"Error playing speech: {str(e)}")
+            return None
+        if result is None:
+            return None
+        self.last_time_to_first_audio = result.time_to_first_audio
+        self.current_audio_data = result.audio_data
+        self.current_sample_rate = result.sample_rate
+        self.current_file = None
+        return self.current_audio_data
+
+    def speak(self, text, dialect='standard', emotion='neutral', token=None):
+        """Stream text to the output device and return what was played as a SpeechResult.
+
+        Like play_stream() but leaves the engine's state alone, so it can run on
+        several threads. Returns None if nothing could be synthesized.
+        Cancelling token stops synthesis and playback and raises JobCancelled.
+        """
+        with self.metrics.request(dialect=dialect, emotion=emotion, characters=len(text), mode='stream') as event:
+            self.metrics.increment('characters', len(text))
+            start = time.perf_counter()
+            if token is not None:
+                token.raise_if_cancelled()
+            chunks = self.stream_speech(text, dialect, emotion)
+            played = []
+            try:
+                first = next(chunks, None)
+                if first is None:
+                    event['error'] = "no audio generated"
+                    return None
+                first_chunk, sample_rate = first
+                channels = 1 if first_chunk.ndim == 1 else first_chunk.shape[1]
+                with self._output(sample_rate, channels, token) as player:
+                    pending = first
+                    while pending is not None:
+                        chunk = pending[0]
+                        # Blocks while the playback buffer is full (backpressure)
+                        if not player.feed(chunk):
+                            break
+                        played.append(chunk)
+                        pending = next(chunks, None)
+            finally:
+                chunks.close()
+            if token is not None:
+                token.raise_if_cancelled()
+
+            if not played:
+                event['error'] = "no audio generated"
+                return None
+            result = SpeechResult(text, dialect, emotion, np.concatenate(played), sample_rate)
+            if player.first_audio_time is not None:
+                result.time_to_first_audio = player.first_audio_time - start
+                self.metrics.observe('time_to_first_audio', result.time_to_first_audio)
+            event['audio_seconds'] = result.duration
+            return result
+
+    def synthesize_to_file(self, text, path, dialect='standard', emotion='neutral', max_chars=LONG_CHUNK_CHARS):
+        """Long-document mode: synthesize text chunk by chunk straight into an audio file.
+
+        Chunks of at most max_chars go through stream_speech() and are appended
+        to an open SoundFile as they arrive, so peak memory does not grow with
+        the length of the document. The file is written under a temporary name
+        and moved into place once complete; save() and play() then work from
+        it. Returns the seconds of audio written, or None if nothing was.
+        """
+        with self.metrics.request(dialect=dialect, emotion=emotion, characters=len(text), mode='file') as event:
+            self.metrics.increment('characters', len(text))
+            root, ext = os.path.splitext(path)
+            partial = f"{root}.partial{ext}"
+            writer = None
+            frames = 0
+            try:
+                for chunk, sample_rate in self.stream_speech(text, dialect, emotion, max_chars):
+                    if writer is None:
+                        channels = 1 if chunk.ndim == 1 else chunk.shape[1]
+                        writer = StreamingEncoder(partial, sample_rate, channels, self.sample_rate)
+                    writer.write(chunk)
+                    frames += len(chunk)
+            except Exception as e:
+                print(f"Error generating long document: {str(e)}")
+                frames = 0
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            if not frames:
+                if os.path.exists(partial):
+                    os.unlink(partial)
+                event['error'] = "no audio generated"
+                return None
+            os.replace(partial, path)
+            self.current_audio_data = None
+            self.current_file = path
+            self.current_sample_rate = writer.sample_rate
+            event['audio_seconds'] = writer.frames / writer.sample_rate
+            return event['audio_seconds']
+
+    @contextmanager
+    def _output(self, sample_rate, channels, token=None):
+        """Open an output stream drained by a _StreamPlayer and yield the player.
+
+        On leaving the block the end of the stream is queued and the caller
+        waits on the player's finished event, which the stream sets once the
+        last sample has been played; stop() or cancelling token sets it early.
+        """
+        import sounddevice as sd
+        
+        player = _StreamPlayer(self.stream_buffer_chunks)
+        if token is not None:
+            token.add_callback(player.abort)
+        with self._players_lock:
+            self._players.add(player)
+            self.is_playing = True
+        try:
+            with sd.OutputStream(samplerate=sample_rate, channels=channels, dtype='float32',
+                                 callback=player.callback, finished_callback=player.finished.set):
+                yield player
+                player.close()
+                player.finished.wait()
+        finally:
+            with self._players_lock:
+                self._players.discard(player)
+                self.is_playing = bool(self._players)
+
+    def play(self, result=None, token=None, block_seconds=1.0):
+        """Play a SpeechResult, or the current audio or file, and return when it ends.
+
+        Audio is fed to the output stream one block at a time, so results that
+        only exist on disk are never loaded whole. Returns False if there was
+        nothing to play or playback was cut short by stop() or token.
+        """
+        if result is not None:
+            audio_data, sample_rate, path = result.audio_data, result.sample_rate, None
+        else:
+            audio_data, sample_rate, path = self.current_audio_data, self.current_sample_rate, self.current_file
+        if audio_data is not None:
+            block_frames = int(sample_rate * block_seconds)
+            channels = 1 if audio_data.ndim == 1 else audio_data.shape[1]
+            blocks = (audio_data[start:start + block_frames] for start in range(0, len(audio_data), block_frames))
+        elif path is not None:
+            info = sf.info(path)
+            sample_rate, channels = info.samplerate, info.channels
+            blocks = sf.blocks(path, blocksize=int(sample_rate * block_seconds), dtype='float32')
+        else:
+            return False
+        
+        with self._output(sample_rate, channels, token) as player:
+            for block in blocks:
+                if not player.feed(block):
+                    break
+        return not player.aborted
+
+    def stop(self):
+        """Abort every playback in progress"""
+        with self._players_lock:
+            players = list(self._players)
+        for player in players:
+            player.abort()
+
+    def save(self, path, sample_rate=None, mono=False):
+        """Write the current audio to path; the extension picks WAV, FLAC, OGG or OPUS.
+
+        sample_rate (default self.sample_rate) converts the rate on the way out,
+        e.g. 8000 or 16000 for telephony.
+        """
+        sample_rate = sample_rate or self.sample_rate
+        try:
+            if self.current_audio_data is not None and self.current_sample_rate:
+                write_audio(path, self.current_audio_data, self.current_sample_rate, sample_rate, mono=mono)
+                return True
+            if self.current_file is not None:
+                return self._save_file(self.current_file, path, sample_rate, mono)
+        except Exception as e:
+            print(f"Error saving audio: {str(e)}")
+        return False
+
+    def _save_file(self, source, path, sample_rate=None, mono=False, block_frames=65536):
+        """Copy an on-disk result to path, re-encoding block by block if anything changes"""
+        info = sf.info(source)
+        unchanged = (sample_rate in (None, info.samplerate) and not (mono and info.channels > 1)
+                     and os.path.splitext(source)[1].lower() == os.path.splitext(path)[1].lower())
+        if unchanged:
+            if os.path.abspath(source) != os.path.abspath(path):
+                shutil.copyfile(source, path)
+            return True
+        # Encode beside the destination so saving over the source never truncates it mid-read
+        root, ext = os.path.splitext(path)
+        partial = f"{root}.partial{ext}"
+        try:
+            with StreamingEncoder(partial, info.samplerate, info.channels, sample_rate, mono=mono) as writer:
+                for block in sf.blocks(source, blocksize=block_frames, dtype='float32'):
+                    writer.write(block)
+        except Exception:
+            if os.path.exists(partial):
+                os.unlink(partial)
+            raise
+        os.replace(partial, path)
+        if source == self.current_file and os.path.abspath(source) == os.path.abspath(path):
+            self.current_sample_rate = writer.sample_rate
+        return True
+
+    def cleanup(self):
+        self.stop()
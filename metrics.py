@@ -0,0 +1,193 @@
+import cProfile
+import json
+import logging
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds for latency histograms
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_DISABLED = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket latency histogram in the Prometheus style"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        index = 0
+        while index < len(self.buckets) and seconds > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def snapshot(self):
+        cumulative, total = {}, 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            cumulative['+Inf' if bound == float('inf') else repr(bound)] = total
+        return {'count': self.count, 'sum_seconds': self.sum, 'buckets': cumulative}
+
+
+class JsonLogExporter:
+    """Writes one JSON line per finished request to a logger"""
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger('marathi_tts.metrics')
+
+    def export(self, event):
+        self.logger.info(json.dumps(event, ensure_ascii=False))
+
+
+class Metrics:
+    """Counters, per-stage latency histograms and request events for ``MarathiTTS``.
+
+    When ``enabled`` is False, ``stage()`` returns a shared no-op context and
+    the counter methods return immediately, so instrumented code pays only an
+    attribute check. Exporters receive one event dict per request. If
+    ``profile_every`` is set, every Nth request runs under cProfile and
+    ``profile_hook(stats, event)`` gets the resulting ``pstats.Stats``.
+    """
+
+    def __init__(self, enabled=True, exporters=(), profile_every=0, profile_hook=None, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.exporters = list(exporters)
+        self.profile_every = profile_every
+        self.profile_hook = profile_hook
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._requests_seen = 0
+        self._server = None
+
+    def increment(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def stage(self, name):
+        """Context manager that records the duration of a pipeline stage"""
+        if not self.enabled:
+            return _DISABLED
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    @contextmanager
+    def request(self, **fields):
+        """Wrap one synthesis request; yields a dict the caller can add fields to"""
+        if not self.enabled:
+            yield {}
+            return
+
+        with self._lock:
+            self._requests_seen += 1
+            profiled = bool(self.profile_every and self.profile_hook
+                            and self._requests_seen % self.profile_every == 0)
+        event = dict(fields)
+        profile = cProfile.Profile() if profiled else None
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield event
+        except Exception as e:
+            event['error'] = str(e)
+            raise
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - start
+            self.increment('requests')
+            if event.get('error'):
+                self.increment('errors')
+            self.observe('request', elapsed)
+            event['seconds'] = elapsed
+            event['timestamp'] = time.time()
+            for exporter in self.exporters:
+                try:
+                    exporter.export(event)
+                except Exception as e:
+                    print(f"Error exporting metrics: {str(e)}")
+            if profile is not None:
+                self.profile_hook(pstats.Stats(profile), event)
+
+    def snapshot(self):
+        """Return a copy of all counters and histograms"""
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': {name: histogram.snapshot() for name, histogram in self._histograms.items()},
+            }
+
+    def prometheus_text(self, prefix='marathi_tts'):
+        """Render the current values in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        if snapshot['histograms']:
+            metric = f"{prefix}_latency_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, histogram in sorted(snapshot['histograms'].items()):
+                for bound, count in histogram['buckets'].items():
+                    lines.append(f'{metric}_bucket{{name="{name}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{name="{name}"}} {histogram["sum_seconds"]}')
+                lines.append(f'{metric}_count{{name="{name}"}} {histogram["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def serve_prometheus(self, port=9464, host='127.0.0.1'):
+        """Serve ``/metrics`` from a background thread; returns the server"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
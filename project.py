@@ -1,295 +1,17 @@
 # Required dependencies:
-# pip install gtts pygame customtkinter pillow sounddevice numpy scipy pydub
+# pip install gtts customtkinter pillow sounddevice soundfile numpy
 import customtkinter as ctk
-from gtts import gTTS
-import pygame
 import os
-import sounddevice as sd
-import soundfile as sf
 from tkinter import filedialog
-from threading import Thread
-import numpy as np
-from scipy import signal
-import tempfile
-import re
-from pydub import AudioSegment
-from pydub.effects import speedup
-
-class MarathiDialect:
-    def __init__(self, name, substitutions, rhythm_pattern=1.0, articulation=1.0, style='neutral'):
-        self.name = name
-        self.substitutions = substitutions
-        self.rhythm_pattern = rhythm_pattern
-        self.articulation = articulation
-        self.style = style
-
-    def apply_dialect(self, text):
-        """Apply dialect-specific substitutions to text"""
-        modified_text = text
-        for original, replacement in self.substitutions.items():
-            modified_text = modified_text.replace(original, replacement)
-        return modified_text
-
-class EmotionModifier:
-    def __init__(self):
-        # Emotion parameters with built-in speed and volume adjustments
-        self.emotions = {
-            'neutral': {'intensity': 1.0, 'speed_factor': 1.0, 'volume': 0.9, 'pause_length': 1.0},
-            'happy': {'intensity': 1.15, 'speed_factor': 1.1, 'volume': 1.1, 'pause_length': 0.8},
-            'angry': {'intensity': 1.8, 'speed_factor': -1.13, 'volume': 1.8, 'pause_length': 0.25},
-            'sad': {'intensity': 0.8, 'speed_factor': 0.89, 'volume': 0.7, 'pause_length': 1.4},
-            'punctuation': {'intensity': 1.0, 'speed_factor': 1.2, 'volume': 1.7, 'pause_length': 1.0}
-        }
-
-    def modify_audio(self, audio_data, emotion='neutral'):
-        params = self.emotions[emotion]
-        modified = audio_data.copy()
-        
-        # Apply intensity
-        if params['intensity'] != 1.0:
-            modified = self.change_intensity(modified, params['intensity'])
-            
-        # Handle speed factor (convert negative to appropriate positive value)
-        speed_factor = params['speed_factor']
-        if speed_factor != 1.0:
-            actual_speed = abs(speed_factor) if speed_factor > 0 else (1 / abs(speed_factor))
-            modified = self.change_rhythm(modified, actual_speed)
-            
-        # Apply volume
-        modified = modified * params['volume']
-        return modified
-
-    def change_intensity(self, audio_data, intensity_factor):
-        """Change articulation intensity without affecting base tone"""
-        mean_val = np.mean(audio_data)
-        modified = mean_val + (audio_data - mean_val) * intensity_factor
-        return modified
-
-    def change_rhythm(self, audio_data, rhythm_factor):
-        """Change speech rhythm/speed without affecting tone"""
-        if rhythm_factor <= 0:
-            rhythm_factor = 1.0
-        return signal.resample(audio_data, int(len(audio_data) / rhythm_factor))
-
-class MarathiTTS:
-    def __init__(self):
-        pygame.mixer.init()
-        self.emotion_modifier = EmotionModifier()
-        
-        # Dialect definitions
-        self.dialects = {
-            'standard': MarathiDialect('मानक मराठी', {}, 1.0, 1.0),
-            'varhadi': MarathiDialect('वरहाडी', {
-                'गा': 'मा', 'ळ': 'ल', 'आहे': 'आय', 'नाही': 'नाय',
-                'काय': 'काय', 'मी': 'म्ही', 'तू': 'तु',
-                'आपण': 'आपुण', 'झाला': 'झाला',
-                'पाहिजे': 'पाहिजे', 'बोलतो': 'बोलतो'
-            }, 1.1, 1.15),
-            'ahirani': MarathiDialect('अहिराणी', {
-                'आहे': 'हाय', 'नाही': 'नाय', 'मला': 'म्हाला',
-                'तुला': 'तुला', 'झाला': 'झालं',
-                'काय': 'काय', 'कसं': 'कसं',
-                'पाहिजे': 'पायजे', 'जातो': 'जातो'
-            }, 1.12, 1.2),
-            'malwani': MarathiDialect('मालवणी', {
-                'व': 'व्ह', 'च': 'च', 'झ': 'झ', 'आहे': 'आस',
-                'नाही': 'नाय', 'काय': 'काय',
-                'कसं': 'कसं', 'तुला': 'तुज्जा',
-                'मला': 'मज्जा', 'पाहिजे': 'पायजे'
-            }, 0.92, 0.9),
-            'nagpuri': MarathiDialect('नागपुरी', {
-                'आहे': 'हाय', 'नाही': 'नाय', 'मला': 'म्हाला',
-                'तुला': 'तुला', 'आपण': 'आपुण',
-                'काय': 'काय', 'करतो': 'करतो',
-                'बोलतो': 'बोलतो'
-            }, 1.12, 1.2),
-            'konkani': MarathiDialect('कोकणी', {
-                'आहे': 'आसा', 'नाही': 'ना', 'काय': 'कितं',
-                'कसं': 'कसं', 'तुला': 'तुका',
-                'मला': 'माका', 'पाहिजे': 'जाय'
-            }, 0.95, 0.93)
-        }
-        self.temp_file = None
-        self.current_audio_data = None
-        self.current_sample_rate = None
-        self.is_playing = False
-        self.sample_rate = 22050
-
-    def generate_speech(self, text, dialect='standard', emotion='neutral', save_path=None):
-        try:
-            if emotion == 'punctuation':
-                return self.generate_punctuated_speech(text, dialect, save_path)
-            else:
-                return self.generate_basic_speech(text, dialect, emotion, save_path)
-        except Exception as e:
-            print(f"Error generating speech: {str(e)}")
-            return None
-
-    def generate_basic_speech(self, text, dialect='standard', emotion='neutral', save_path=None):
-        """Generate speech without punctuation-based modulation"""
-        try:
-            modified_text = self.dialects[dialect].apply_dialect(text)
-            temp = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-            temp_path = temp.name
-            temp.close()
-            
-            tts = gTTS(text=modified_text, lang='mr', slow=False)
-            mp3_path = temp_path.replace('.wav', '.mp3')
-            tts.save(mp3_path)
-            
-            audio_data, sample_rate = sf.read(mp3_path)
-            self.current_sample_rate = sample_rate
-            
-            dialect_obj = self.dialects[dialect]
-            audio_data = self.emotion_modifier.change_rhythm(audio_data, dialect_obj.rhythm_pattern)
-            modified_audio = np.mean(audio_data) + (audio_data - np.mean(audio_data)) * dialect_obj.articulation
-            modified_audio = self.emotion_modifier.modify_audio(modified_audio, emotion)
-            
-            self.current_audio_data = modified_audio
-            sf.write(temp_path, modified_audio, sample_rate)
-            
-            os.unlink(mp3_path)
-            self.temp_file = temp_path
-            
-            if save_path:
-                sf.write(save_path, modified_audio, sample_rate)
-            return temp_path
-            
-        except Exception as e:
-            print(f"Error generating basic speech: {str(e)}")
-            return None
-
-    def generate_punctuated_speech(self, text, dialect='standard', save_path=None):
-        """Generate speech with punctuation-based modulation"""
-        try:
-            # Parameters for punctuation modulation
-            question_volume_increase_db = 10.0
-            exclamation_speed_factor = 1.3
-            other_volume_decrease_db = 5.0
-            
-            # Find sentences using punctuation
-            pattern = r'[^।?!.,;:"\']+[।?!.,;:"\']+|\s*$'
-            sentences = re.findall(pattern, text)
-            
-            if not sentences:
-                sentences = [text]  # If no punctuation, treat as one sentence
-                
-            # Apply dialect modifications to all text
-            dialect_obj = self.dialects[dialect]
-            
-            # Create temp files
-            temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-            temp_wav_path = temp_wav.name
-            temp_wav.close()
-            
-            temp_mp3 = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-            temp_mp3_path = temp_mp3.name
-            temp_mp3.close()
-            
-            # Process each sentence separately
-            full_audio = None
-            
-            for sentence in sentences:
-                if not sentence.strip():
-                    continue
-                    
-                # Apply dialect to the sentence
-                modified_sentence = dialect_obj.apply_dialect(sentence)
-                
-                # Generate speech for the sentence
-                sentence_mp3 = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-                sentence_mp3_path = sentence_mp3.name
-                sentence_mp3.close()
-                
-                tts = gTTS(text=modified_sentence, lang='mr')
-                tts.save(sentence_mp3_path)
-                
-                # Process with pydub
-                audio = AudioSegment.from_mp3(sentence_mp3_path)
-                
-                # Apply punctuation-based modifications
-                last_char = sentence.strip()[-1] if sentence.strip() else ''
-                
-                if last_char == '?':
-                    # Increase volume for questions
-                    audio = audio + question_volume_increase_db
-                elif last_char == '!':
-                    # Speed up for exclamations
-                    audio = speedup(audio, playback_speed=exclamation_speed_factor, chunk_size=150, crossfade=25)
-                else:
-                    # Slight volume reduction for regular sentences
-                    audio = audio - other_volume_decrease_db
-                
-                # Add to full audio
-                if full_audio is None:
-                    full_audio = audio
-                else:
-                    full_audio += audio
-                    
-                # Clean up temp file
-                os.unlink(sentence_mp3_path)
-            
-            if full_audio:
-                # Export the final audio
-                full_audio.export(temp_mp3_path, format="mp3")
-                
-                # Convert to numpy array for consistency with the rest of the system
-                audio_data, sample_rate = sf.read(temp_mp3_path)
-                self.current_sample_rate = sample_rate
-                self.current_audio_data = audio_data
-                
-                # Apply dialect's rhythm pattern and articulation
-                audio_data = self.emotion_modifier.change_rhythm(audio_data, dialect_obj.rhythm_pattern)
-                modified_audio = np.mean(audio_data) + (audio_data - np.mean(audio_data)) * dialect_obj.articulation
-                
-                # Save the audio
-                sf.write(temp_wav_path, modified_audio, sample_rate)
-                self.temp_file = temp_wav_path
-                
-                if save_path:
-                    sf.write(save_path, modified_audio, sample_rate)
-                    
-                # Clean up the temp MP3
-                os.unlink(temp_mp3_path)
-                
-                return temp_wav_path
-            else:
-                raise Exception("No audio was generated")
-                
-        except Exception as e:
-            print(f"Error generating punctuated speech: {str(e)}")
-            if 'temp_mp3_path' in locals() and os.path.exists(temp_mp3_path):
-                os.unlink(temp_mp3_path)
-            if 'temp_wav_path' in locals() and os.path.exists(temp_wav_path):
-                os.unlink(temp_wav_path)
-            return None
-
-    def play(self):
-        if self.temp_file and not self.is_playing:
-            pygame.mixer.music.load(self.temp_file)
-            pygame.mixer.music.play()
-            self.is_playing = True
-            while pygame.mixer.music.get_busy():
-                pygame.time.Clock().tick(10)
-            self.is_playing = False
-
-    def stop(self):
-        pygame.mixer.music.stop()
-        self.is_playing = False
-
-    def save(self, path):
-        if self.current_audio_data is not None and self.current_sample_rate:
-            sf.write(path, self.current_audio_data, self.current_sample_rate)
-            return True
-        return False
-
-    def cleanup(self):
-        if self.temp_file and os.path.exists(self.temp_file):
-            os.unlink(self.temp_file)
+from marathi_tts import MarathiDialect, EmotionModifier, EffectChain, MarathiTTS
+from scheduler import JobScheduler
 
 class TTSUI:
     def __init__(self):
         self.tts_engine = MarathiTTS()
+        # Each click becomes a job; a newer click cancels the one still running
+        self.scheduler = JobScheduler(self.tts_engine, workers=2)
+        self.last_result = None
         
         ctk.set_appearance_mode("dark")
         ctk.set_default_color_theme("blue")
@@ -436,39 +158,41 @@ class TTSUI:
         dialect = self.dialect_var.get()
         emotion = self.emotion_var.get()
         
-        def generate_and_play():
-            try:
-                audio_file = self.tts_engine.generate_speech(text, dialect, emotion)
-                if audio_file:
-                    self.tts_engine.play()
-                    
-                    # Get appropriate status message based on emotion
-                    if emotion == 'punctuation':
-                        status_text = "बोलणे सुरू आहे... (विरामचिन्हे प्रभाव सह)"
-                    else:
-                        emotion_params = self.tts_engine.emotion_modifier.emotions[emotion]
-                        speed_factor = emotion_params['speed_factor']
-                        volume_factor = emotion_params['volume']
-                        emotion_name_map = {
-                            'neutral': 'न्यूट्रल',
-                            'happy': 'आनंदी',
-                            'angry': 'रागीट',
-                            'sad': 'दुःखी',
-                            'punctuation': 'विरामचिन्हे'
-                        }
-                        emotion_name = emotion_name_map.get(emotion, emotion)
-                        status_text = f"बोलणे सुरू आहे... ({emotion_name} भावना: वेग {speed_factor:.1f}x, आवाज {volume_factor:.1f}x)"
-                    
-                    self.status_label.configure(text=status_text)
-                else:
-                    self.status_label.configure(text="बोलणे तयार करताना त्रुटी आली.")
-            except Exception as e:
-                self.status_label.configure(text=f"त्रुटी: {str(e)}")
-                
-        Thread(target=generate_and_play, daemon=True).start()
+        job = self.scheduler.submit(text, dialect, emotion, group='ui', play=True)
+        # Callbacks run on the worker thread, so hand the result to the Tk loop
+        job.add_done_callback(lambda job: self.window.after(0, self.on_job_done, job))
+
+    def on_job_done(self, job):
+        # A newer click or the stop button owns the status label
+        if job.state == 'cancelled':
+            return
+        if job.state == 'failed':
+            self.status_label.configure(text="बोलणे तयार करताना त्रुटी आली.")
+            return
+        self.last_result = job.result()
+        emotion = job.emotion
+        
+        # Get appropriate status message based on emotion
+        if emotion == 'punctuation':
+            status_text = "बोलणे सुरू आहे... (विरामचिन्हे प्रभाव सह)"
+        else:
+            emotion_params = self.tts_engine.emotion_modifier.emotions[emotion]
+            speed_factor = emotion_params['speed_factor']
+            volume_factor = emotion_params['volume']
+            emotion_name_map = {
+                'neutral': 'न्यूट्रल',
+                'happy': 'आनंदी',
+                'angry': 'रागीट',
+                'sad': 'दुःखी',
+                'punctuation': 'विरामचिन्हे'
+            }
+            emotion_name = emotion_name_map.get(emotion, emotion)
+            status_text = f"बोलणे सुरू आहे... ({emotion_name} भावना: वेग {speed_factor:.1f}x, आवाज {volume_factor:.1f}x)"
+        
+        self.status_label.configure(text=status_text)
 
     def save_audio(self):
-        if self.tts_engine.current_audio_data is None:
+        if self.last_result is None:
             self.status_label.configure(text="आधी बोलणे तयार करा!")
             return
         file_path = filedialog.asksaveasfilename(
@@ -477,13 +201,13 @@ class TTSUI:
             title="ऑडिओ फाइल सेव्ह करा"
         )
         if file_path:
-            if self.tts_engine.save(file_path):
+            if self.last_result.save(file_path, self.tts_engine.sample_rate):
                 self.status_label.configure(text=f"ऑडिओ सेव्ह केला: {os.path.basename(file_path)}")
             else:
                 self.status_label.configure(text="ऑडिओ सेव्ह करताना त्रुटी आली")
 
     def stop_speech(self):
-        self.tts_engine.stop()
+        self.scheduler.cancel_all(group='ui')
         self.status_label.configure(text="बोलणे थांबवले")
 
     def clear_text(self):
@@ -491,6 +215,7 @@ class TTSUI:
         self.status_label.configure(text="")
 
     def on_closing(self):
+        self.scheduler.shutdown(wait=False)
         self.tts_engine.cleanup()
         self.window.destroy()
 
@@ -0,0 +1,207 @@
+"""Cancellable synthesis jobs run by a small worker pool in priority order.
+
+``JobScheduler.submit`` returns a ``Job`` right away. Workers take jobs from a
+priority queue and run ``MarathiTTS.synthesize_speech`` for them, checking the
+job's ``CancellationToken`` between the fetch and render stages; jobs that
+play their result use ``MarathiTTS.speak``, where the token also aborts the
+output stream. Jobs submitted with the same ``group`` supersede each other: a
+new job cancels the group's older ones, so a stale request is dropped wherever
+it is in the pipeline and an interrupted playback stops at once.
+"""
+import itertools
+import queue
+from threading import Thread, Event, Lock
+
+
+class JobCancelled(Exception):
+    """Raised inside a job, and by Job.result(), once the job was cancelled"""
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag with callbacks run when it is set"""
+
+    def __init__(self):
+        self._event = Event()
+        self._lock = Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in cancellation callback: {str(e)}")
+
+    def add_callback(self, callback):
+        """Call callback on cancel(), or right away if already cancelled"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise JobCancelled()
+
+
+class Job:
+    """Handle for one scheduled request; wait with result(), stop with cancel()"""
+
+    def __init__(self, job_id, text, dialect, emotion, priority=0, group=None, play=False):
+        self.id = job_id
+        self.text = text
+        self.dialect = dialect
+        self.emotion = emotion
+        self.priority = priority
+        self.group = group
+        self.play = play
+        self.token = CancellationToken()
+        self.state = 'queued'
+        self._done = Event()
+        self._lock = Lock()
+        self._result = None
+        self._error = None
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    def cancel(self):
+        """Cancel the job; a running job stops at its next checkpoint or mid-playback"""
+        self.token.cancel()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """Wait for the job and return its SpeechResult, re-raising its error"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Job {self.id} did not finish in {timeout}s")
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def add_done_callback(self, callback):
+        """Call callback(job) from the worker thread when the job finishes"""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _finish(self, result=None, error=None):
+        with self._lock:
+            self._result = result
+            self._error = error
+            if isinstance(error, JobCancelled):
+                self.state = 'cancelled'
+            else:
+                self.state = 'failed' if error is not None else 'done'
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Error in job callback: {str(e)}")
+
+
+class JobScheduler:
+    """Run synthesis jobs for an engine on a small pool of worker threads.
+
+    Lower priority values run first; equal priorities run in submission
+    order. With play=True the worker streams the speech to the output device
+    and the job finishes when playback does.
+    """
+
+    def __init__(self, engine, workers=2):
+        self.engine = engine
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = Lock()
+        self._pending = {}
+        self._closed = False
+        self._workers = [Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, text, dialect='standard', emotion='neutral', priority=0, group=None, play=False):
+        """Queue a job and return it; a job with a group cancels that group's older jobs"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Scheduler has been shut down")
+            sequence = next(self._sequence)
+            job = Job(sequence, text, dialect, emotion, priority, group, play)
+            if group is not None:
+                for other in self._pending.values():
+                    if other.group == group:
+                        other.cancel()
+            self._pending[job.id] = job
+        self.engine.metrics.increment('jobs_submitted')
+        self._queue.put((priority, sequence, job))
+        return job
+
+    def cancel_all(self, group=None):
+        """Cancel every queued and running job, or only those in group"""
+        with self._lock:
+            jobs = [job for job in self._pending.values() if group is None or job.group == group]
+        for job in jobs:
+            job.cancel()
+
+    def shutdown(self, wait=True, cancel=True):
+        """Stop accepting jobs, optionally cancel the pending ones, and stop the workers"""
+        with self._lock:
+            self._closed = True
+        if cancel:
+            self.cancel_all()
+        # Sentinels sort after every real job
+        for _ in self._workers:
+            self._queue.put((float('inf'), next(self._sequence), None))
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._pending.pop(job.id, None)
+
+    def _run(self, job):
+        if job.cancelled:
+            self.engine.metrics.increment('jobs_cancelled')
+            job._finish(error=JobCancelled())
+            return
+        job.state = 'running'
+        try:
+            if job.play:
+                # Playback starts with the first sentence while the rest is synthesized
+                result = self.engine.speak(job.text, job.dialect, job.emotion, job.token)
+                if result is None:
+                    raise Exception("No audio was generated")
+            else:
+                result = self.engine.synthesize_speech(job.text, job.dialect, job.emotion, job.token)
+        except JobCancelled as e:
+            self.engine.metrics.increment('jobs_cancelled')
+            job._finish(error=e)
+        except Exception as e:
+            print(f"Error in job {job.id}: {str(e)}")
+            job._finish(error=e)
+        else:
+            job._finish(result=result)
@@ -0,0 +1,347 @@
+"""Asyncio HTTP synthesis service around the headless MarathiTTS engine.
+
+Endpoints (JSON body ``{"text": ..., "dialect": ..., "emotion": ...}``, plus
+optional ``"format"`` (wav, flac, ogg, opus) and ``"sample_rate"``):
+
+    POST /synthesize   complete audio file in the requested format
+    POST /stream       chunked 16-bit WAV, one chunk per sentence as it is ready
+    GET  /health       queue and coalescing counters as JSON
+    GET  /metrics      Prometheus text from the engine's Metrics
+
+Identical in-flight /synthesize requests share one synthesis. At most
+``--max-concurrent`` syntheses run at a time with ``--max-queue`` more waiting;
+anything beyond that is answered with 503. Fetches run on a thread pool and the
+DSP on a thread or process pool, so the event loop never blocks.
+
+    python service.py --port 8080 --offline
+"""
+import argparse
+import asyncio
+import json
+import struct
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
+
+import numpy as np
+
+import batch
+from backends import OfflineBackend
+from encoders import StreamingResampler, dither_to_pcm16, encode_bytes
+from marathi_tts import MarathiTTS
+from metrics import Metrics
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_TEXT_CHARS = 5000
+MIN_SAMPLE_RATE, MAX_SAMPLE_RATE = 8000, 48000
+
+CONTENT_TYPES = {'wav': 'audio/wav', 'flac': 'audio/flac', 'ogg': 'audio/ogg', 'opus': 'audio/ogg'}
+
+
+class Overloaded(Exception):
+    """Raised when the admission queue is full"""
+
+
+def _render_audio(pieces, dialect, emotion, format='wav', out_rate=None, engine=None):
+    """Executor task: run the DSP stage and encode the result in the requested format"""
+    # Process workers use the DSP-only engine set up by batch._init_worker
+    engine = engine or batch._worker_engine
+    audio_data, sample_rate = engine.render(pieces, dialect, emotion)
+    return encode_bytes(audio_data, sample_rate, format, out_rate)
+
+
+def _convert_chunk(resampler, chunk, rng):
+    """Executor task: resample (or, for chunk None, flush) and dither one streamed chunk"""
+    if resampler is not None:
+        chunk = resampler.flush() if chunk is None else resampler.process(chunk)
+    return dither_to_pcm16(chunk, rng).tobytes()
+
+
+def wav_stream_header(sample_rate, channels):
+    """WAV header for 16-bit PCM of unknown length, as used for streamed responses"""
+    unknown = 0xFFFFFFFF
+    return (b'RIFF' + struct.pack('<I', unknown) + b'WAVE'
+            + b'fmt ' + struct.pack('<IHHIIHH', 16, 1, channels, sample_rate,
+                                    sample_rate * channels * 2, channels * 2, 16)
+            + b'data' + struct.pack('<I', unknown))
+
+
+class SynthesisService:
+    """Request coalescing and admission control in front of a MarathiTTS engine"""
+
+    def __init__(self, engine, max_concurrent=4, max_queue=32, fetch_workers=8, dsp_workers=0):
+        self.engine = engine
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers)
+        if dsp_workers:
+            self.dsp_pool = ProcessPoolExecutor(max_workers=dsp_workers, initializer=batch._init_worker)
+            self._render = _render_audio
+        else:
+            self.dsp_pool = ThreadPoolExecutor(max_workers=max_concurrent)
+            self._render = partial(_render_audio, engine=engine)
+        # /stream chunks share resampler state, so they are converted on threads in this process
+        self.stream_pool = ThreadPoolExecutor(max_workers=max_concurrent) if dsp_workers else self.dsp_pool
+        self.stats = Counter()
+        # Not bound to a loop until first used (Python 3.10+), so it works outside serve()
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._admitted = 0
+        self._in_flight = {}
+
+    async def synthesize(self, text, dialect, emotion, format='wav', sample_rate=None):
+        """Return encoded audio, sharing the work with an identical request already in flight"""
+        key = (text, dialect, emotion, format, sample_rate)
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            self.engine.metrics.increment('coalesced')
+            return await asyncio.shield(task)
+
+        self._admit()
+        task = asyncio.ensure_future(self._synthesize(text, dialect, emotion, format, sample_rate))
+        self._in_flight[key] = task
+
+        def finished(_):
+            self._in_flight.pop(key, None)
+            self._admitted -= 1
+        task.add_done_callback(finished)
+        # Shielded so a client that disconnects does not cancel it for the others
+        return await asyncio.shield(task)
+
+    async def _synthesize(self, text, dialect, emotion, format, sample_rate):
+        loop = asyncio.get_running_loop()
+        metrics = self.engine.metrics
+        # One request event per synthesis; coalesced followers are counted separately
+        with metrics.request(dialect=dialect, emotion=emotion, characters=len(text), mode='service',
+                             format=format) as event:
+            metrics.increment('characters', len(text))
+            async with self._slots:
+                pieces = await loop.run_in_executor(self.fetch_pool, self.engine.fetch, text, dialect, emotion)
+                audio = await loop.run_in_executor(self.dsp_pool, self._render, pieces, dialect, emotion,
+                                                   format, sample_rate)
+            event['bytes'] = len(audio)
+            return audio
+
+    def _admit(self):
+        if self._admitted >= self.max_concurrent + self.max_queue:
+            self.stats['rejected'] += 1
+            self.engine.metrics.increment('rejected')
+            raise Overloaded("synthesis queue is full")
+        self._admitted += 1
+
+    async def handle(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it closes"""
+        try:
+            while True:
+                request = await self._read_request(reader, writer)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                await self._dispatch(method, path, body, writer)
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader, writer):
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, path, _ = line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            await self._respond(writer, 400, {'error': "malformed request line"})
+            return None
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be skipped without a valid length, so the connection is closed
+            await self._respond(writer, 400, {'error': "invalid Content-Length"})
+            return None
+        if length > MAX_BODY_BYTES:
+            await self._respond(writer, 413, {'error': "request body too large"})
+            return None
+        body = await reader.readexactly(length) if length else b''
+        return method, path.split('?')[0], headers, body
+
+    async def _dispatch(self, method, path, body, writer):
+        self.stats['requests'] += 1
+        if method == 'GET' and path == '/health':
+            health = dict(self.stats, admitted=self._admitted, in_flight=len(self._in_flight))
+            return await self._respond(writer, 200, health)
+        if method == 'GET' and path == '/metrics':
+            return await self._respond(writer, 200, self.engine.metrics.prometheus_text().encode('utf-8'),
+                                       'text/plain; version=0.0.4')
+        if method != 'POST' or path not in ('/synthesize', '/stream'):
+            return await self._respond(writer, 404, {'error': "not found"})
+
+        try:
+            text, dialect, emotion, format, sample_rate = self._parse(body)
+        except ValueError as e:
+            return await self._respond(writer, 400, {'error': str(e)})
+
+        if path == '/stream':
+            return await self._stream(text, dialect, emotion, sample_rate, writer)
+        try:
+            audio = await self.synthesize(text, dialect, emotion, format, sample_rate)
+        except Overloaded as e:
+            return await self._respond(writer, 503, {'error': str(e)}, extra_headers={'Retry-After': '1'})
+        except Exception as e:
+            print(f"Error synthesizing request: {str(e)}", file=sys.stderr)
+            return await self._respond(writer, 500, {'error': str(e)})
+        await self._respond(writer, 200, audio, CONTENT_TYPES[format])
+
+    def _parse(self, body):
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            raise ValueError("body must be JSON")
+        if not isinstance(request, dict):
+            raise ValueError("body must be a JSON object")
+        text = str(request.get('text') or '').strip()
+        dialect = request.get('dialect') or 'standard'
+        emotion = request.get('emotion') or 'neutral'
+        format = request.get('format') or 'wav'
+        for name, value in (('dialect', dialect), ('emotion', emotion), ('format', format)):
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be a string")
+        if not text:
+            raise ValueError("text is required")
+        if len(text) > MAX_TEXT_CHARS:
+            raise ValueError(f"text is longer than {MAX_TEXT_CHARS} characters")
+        if dialect not in self.engine.dialects:
+            raise ValueError(f"unknown dialect '{dialect}'")
+        if emotion not in self.engine.emotion_modifier.emotions:
+            raise ValueError(f"unknown emotion '{emotion}'")
+        format = format.lower()
+        if format not in CONTENT_TYPES:
+            raise ValueError(f"unknown format '{format}'")
+        sample_rate = request.get('sample_rate') or self.engine.sample_rate
+        if sample_rate is not None:
+            if not isinstance(sample_rate, int) or not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+                raise ValueError(f"sample_rate must be an integer from {MIN_SAMPLE_RATE} to {MAX_SAMPLE_RATE}")
+        return text, dialect, emotion, format, sample_rate
+
+    async def _stream(self, text, dialect, emotion, out_rate, writer):
+        """Send sentences as chunked 16-bit WAV as soon as each one is processed"""
+        try:
+            self._admit()
+        except Overloaded as e:
+            return await self._respond(writer, 503, {'error': str(e)}, extra_headers={'Retry-After': '1'})
+        loop = asyncio.get_running_loop()
+        metrics = self.engine.metrics
+        chunks = None
+        try:
+            with metrics.request(dialect=dialect, emotion=emotion, characters=len(text),
+                                 mode='service-stream') as event:
+                metrics.increment('characters', len(text))
+                async with self._slots:
+                    chunks = self.engine.stream_speech(text, dialect, emotion)
+                    first = await loop.run_in_executor(self.fetch_pool, next, chunks, None)
+                    if first is None:
+                        event['error'] = "no audio generated"
+                        return await self._respond(writer, 500, {'error': "no audio generated"})
+                    chunk, sample_rate = first
+                    channels = 1 if chunk.ndim == 1 else chunk.shape[1]
+                    # The resampler keeps its state across sentences, so there are no seams
+                    resampler = StreamingResampler(sample_rate, out_rate) if out_rate and out_rate != sample_rate else None
+                    rng = np.random.default_rng()
+                    self.stats['status_200'] += 1
+                    writer.write(self._status_line(200, {'Content-Type': 'audio/wav',
+                                                         'Transfer-Encoding': 'chunked'}))
+                    self._write_chunk(writer, wav_stream_header(out_rate or sample_rate, channels))
+                    while first is not None:
+                        data = await loop.run_in_executor(self.stream_pool, _convert_chunk, resampler, first[0], rng)
+                        self._write_chunk(writer, data)
+                        await writer.drain()
+                        first = await loop.run_in_executor(self.fetch_pool, next, chunks, None)
+                    if resampler is not None:
+                        data = await loop.run_in_executor(self.stream_pool, _convert_chunk, resampler, None, rng)
+                        self._write_chunk(writer, data)
+                    writer.write(b'0\r\n\r\n')
+                    await writer.drain()
+        finally:
+            if chunks is not None:
+                chunks.close()
+            self._admitted -= 1
+
+    @staticmethod
+    def _write_chunk(writer, data):
+        # An empty chunk would end the response
+        if not data:
+            return
+        writer.write(f"{len(data):X}\r\n".encode('ascii') + data + b'\r\n')
+
+    @staticmethod
+    def _status_line(status, headers):
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _respond(self, writer, status, body, content_type='application/json', extra_headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.stats[f'status_{status}'] += 1
+        headers = {'Content-Type': content_type, 'Content-Length': str(len(body))}
+        headers.update(extra_headers or {})
+        writer.write(self._status_line(status, headers) + body)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        """Run the HTTP server until cancelled"""
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving on http://{host}:{server.sockets[0].getsockname()[1]}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        self.fetch_pool.shutdown(wait=False)
+        self.dsp_pool.shutdown(wait=False)
+        self.stream_pool.shutdown(wait=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Marathi text-to-speech HTTP service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--max-concurrent', type=int, default=4, help="syntheses running at once")
+    parser.add_argument('--max-queue', type=int, default=32, help="syntheses waiting before 503")
+    parser.add_argument('--fetch-workers', type=int, default=8, help="concurrent network fetches")
+    parser.add_argument('--dsp-workers', type=int, default=0,
+                        help="DSP processes (default: run the DSP on threads)")
+    parser.add_argument('--cache-dir', default=None, help="synthesis cache directory")
+    parser.add_argument('--no-cache', action='store_true', help="disable the synthesis cache")
+    parser.add_argument('--offline', action='store_true',
+                        help="use the deterministic offline backend instead of gTTS (for load tests)")
+    args = parser.parse_args(argv)
+
+    backend = OfflineBackend() if args.offline else None
+    engine = MarathiTTS(cache_dir=args.cache_dir, use_cache=not args.no_cache, fetch_workers=args.fetch_workers,
+                        backend=backend, metrics=Metrics())
+    service = SynthesisService(engine, args.max_concurrent, args.max_queue, args.fetch_workers,
+                               args.dsp_workers or 0)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Template synthesis for IVR-style prompts such as "तुमचा क्रमांक {n:number} आहे".
+
+The fixed text of a template is rendered once per dialect and emotion and kept
+in a unit store. A request only synthesizes its slot values; the pieces are then
+trimmed, loudness-matched and joined with short crossfades. Slots are written
+``{name}`` (spoken as given) or ``{name:kind}`` with kind ``number``,
+``digits`` or ``date``, which are converted to Marathi words first.
+"""
+import datetime
+import string
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from audio_cache import AudioCache
+from encoders import write_audio
+
+ONES = [
+    'शून्य', 'एक', 'दोन', 'तीन', 'चार', 'पाच', 'सहा', 'सात', 'आठ', 'नऊ',
+    'दहा', 'अकरा', 'बारा', 'तेरा', 'चौदा', 'पंधरा', 'सोळा', 'सतरा', 'अठरा', 'एकोणीस',
+    'वीस', 'एकवीस', 'बावीस', 'तेवीस', 'चोवीस', 'पंचवीस', 'सव्वीस', 'सत्तावीस', 'अठ्ठावीस', 'एकोणतीस',
+    'तीस', 'एकतीस', 'बत्तीस', 'तेहेतीस', 'चौतीस', 'पस्तीस', 'छत्तीस', 'सदतीस', 'अडतीस', 'एकोणचाळीस',
+    'चाळीस', 'एक्केचाळीस', 'बेचाळीस', 'त्रेचाळीस', 'चव्वेचाळीस', 'पंचेचाळीस', 'सेहेचाळीस', 'सत्तेचाळीस',
+    'अठ्ठेचाळीस', 'एकोणपन्नास',
+    'पन्नास', 'एक्कावन्न', 'बावन्न', 'त्रेपन्न', 'चोपन्न', 'पंचावन्न', 'छप्पन्न', 'सत्तावन्न', 'अठ्ठावन्न', 'एकोणसाठ',
+    'साठ', 'एकसष्ठ', 'बासष्ठ', 'त्रेसष्ठ', 'चौसष्ठ', 'पासष्ठ', 'सहासष्ठ', 'सदुसष्ठ', 'अडुसष्ठ', 'एकोणसत्तर',
+    'सत्तर', 'एकाहत्तर', 'बाहत्तर', 'त्र्याहत्तर', 'चौऱ्याहत्तर', 'पंचाहत्तर', 'शहात्तर', 'सत्याहत्तर',
+    'अठ्ठ्याहत्तर', 'एकोणऐंशी',
+    'ऐंशी', 'एक्क्याऐंशी', 'ब्याऐंशी', 'त्र्याऐंशी', 'चौऱ्याऐंशी', 'पंच्याऐंशी', 'शहाऐंशी', 'सत्त्याऐंशी',
+    'अठ्ठ्याऐंशी', 'एकोणनव्वद',
+    'नव्वद', 'एक्क्याण्णव', 'ब्याण्णव', 'त्र्याण्णव', 'चौऱ्याण्णव', 'पंच्याण्णव', 'शहाण्णव', 'सत्त्याण्णव',
+    'अठ्ठ्याण्णव', 'नव्व्याण्णव',
+]
+
+# Indian grouping: crore, lakh, thousand
+SCALES = [(10 ** 7, 'कोटी'), (10 ** 5, 'लाख'), (1000, 'हजार')]
+
+MONTHS = ['जानेवारी', 'फेब्रुवारी', 'मार्च', 'एप्रिल', 'मे', 'जून',
+          'जुलै', 'ऑगस्ट', 'सप्टेंबर', 'ऑक्टोबर', 'नोव्हेंबर', 'डिसेंबर']
+
+# Devanagari digits are accepted wherever a number is expected
+DIGITS = str.maketrans('०१२३४५६७८९', '0123456789')
+
+
+def _hundreds(n):
+    """Words for 1 <= n <= 999"""
+    hundreds, rest = divmod(n, 100)
+    words = []
+    if hundreds:
+        words.append('शंभर' if hundreds == 1 and not rest else ('एकशे' if hundreds == 1 else ONES[hundreds] + 'शे'))
+    if rest:
+        words.append(ONES[rest])
+    return words
+
+
+def number_to_words(value):
+    """Spell an integer in Marathi words, e.g. 1250 -> 'एक हजार दोनशे पन्नास'"""
+    n = int(str(value).translate(DIGITS).replace(',', '').strip())
+    if n == 0:
+        return ONES[0]
+    words = ['उणे'] if n < 0 else []
+    n = abs(n)
+    for scale, name in SCALES:
+        if n >= scale:
+            count, n = divmod(n, scale)
+            words += (number_to_words(count).split() if count > 99 else [ONES[count]]) + [name]
+    if n:
+        words += _hundreds(n)
+    return ' '.join(words)
+
+
+def digits_to_words(value):
+    """Read a number digit by digit, as for phone or account numbers"""
+    return ' '.join(ONES[int(c)] for c in str(value).translate(DIGITS) if c.isdigit())
+
+
+def year_to_words(year):
+    """Spell a year the way it is read aloud, e.g. 1999 -> 'एकोणीसशे नव्व्याण्णव'"""
+    year = int(year)
+    if 1100 <= year < 2000:
+        century, rest = divmod(year, 100)
+        return ONES[century] + 'शे' + (f" {ONES[rest]}" if rest else '')
+    return number_to_words(year)
+
+
+def date_to_words(value):
+    """Spell a date (datetime.date or 'YYYY-MM-DD') as day, month name and year"""
+    if not isinstance(value, datetime.date):
+        value = datetime.date.fromisoformat(str(value).translate(DIGITS).strip())
+    return f"{number_to_words(value.day)} {MONTHS[value.month - 1]} {year_to_words(value.year)}"
+
+
+SLOT_KINDS = {
+    '': str,
+    'text': str,
+    'number': number_to_words,
+    'digits': digits_to_words,
+    'date': date_to_words,
+}
+
+
+class PromptTemplate:
+    """A prompt split into fixed text and ``{slot}`` / ``{slot:kind}`` fields"""
+
+    def __init__(self, template):
+        self.template = template
+        self.parts = []
+        for literal, name, kind, _ in string.Formatter().parse(template):
+            if literal:
+                self.parts.append(('text', literal))
+            if name is not None:
+                if kind not in SLOT_KINDS:
+                    raise ValueError(f"Unknown slot kind '{kind}' in template: {template}")
+                self.parts.append(('slot', (name, kind)))
+
+    def fixed_texts(self):
+        """Return the fixed parts that can be pre-rendered"""
+        return [value for part, value in self.parts if part == 'text' and value.strip()]
+
+    def slot_texts(self, values):
+        """Return the spoken text of every slot, in order, for the given values"""
+        texts = []
+        for part, value in self.parts:
+            if part == 'slot':
+                name, kind = value
+                if name not in values:
+                    raise ValueError(f"No value for slot '{name}'")
+                texts.append(SLOT_KINDS[kind](values[name]))
+        return texts
+
+
+class TemplateSynthesizer:
+    """Splices pre-rendered fixed units with freshly synthesized slot values.
+
+    Units are processed with the same dialect/emotion chain as ``MarathiTTS``
+    output and kept pinned in memory; with ``cache_dir`` they are also stored on
+    disk through ``AudioCache``, so a restarted process does not render them
+    again.
+    """
+
+    def __init__(self, engine, cache_dir=None, crossfade=0.01, trim_db=40.0, edge=0.03):
+        self.engine = engine
+        self.crossfade = crossfade
+        self.trim_db = trim_db
+        self.edge = edge
+        self.units = {}
+        self.store = AudioCache(cache_dir) if cache_dir else None
+        self._templates = {}
+
+    def template(self, template):
+        """Return the parsed PromptTemplate for a template string"""
+        if isinstance(template, PromptTemplate):
+            return template
+        parsed = self._templates.get(template)
+        if parsed is None:
+            parsed = self._templates[template] = PromptTemplate(template)
+        return parsed
+
+    def prepare(self, template, dialect='standard', emotion='neutral'):
+        """Render and store the fixed parts of a template for a dialect/emotion"""
+        missing = [text for text in self.template(template).fixed_texts()
+                   if (dialect, emotion, text) not in self.units]
+        for text, unit in zip(missing, self._render_many(missing, dialect, emotion, store=True)):
+            self.units[(dialect, emotion, text)] = unit
+
+    def render(self, template, values, dialect='standard', emotion='neutral'):
+        """Return (audio_data, sample_rate) for a template filled with values"""
+        template = self.template(template)
+        self.prepare(template, dialect, emotion)
+        slots = iter(self._render_many(template.slot_texts(values), dialect, emotion))
+
+        pieces, variable = [], []
+        for part, value in template.parts:
+            if part == 'slot':
+                pieces.append(next(slots))
+            elif value.strip():
+                pieces.append(self.units[(dialect, emotion, value)])
+            else:
+                continue
+            variable.append(part == 'slot')
+        if not pieces:
+            raise Exception("No audio was generated")
+        return self.splice(pieces, variable)
+
+    def generate(self, template, values, dialect='standard', emotion='neutral', save_path=None):
+        """Like MarathiTTS.generate_speech for a template; returns the audio or None"""
+        engine = self.engine
+        try:
+            audio_data, sample_rate = self.render(template, values, dialect, emotion)
+        except Exception as e:
+            print(f"Error generating template speech: {str(e)}")
+            return None
+        engine.current_audio_data = audio_data
+        engine.current_sample_rate = sample_rate
+        engine.current_file = None
+        if save_path:
+            write_audio(save_path, audio_data, sample_rate, engine.sample_rate)
+        return audio_data
+
+    def splice(self, pieces, variable):
+        """Join (audio_data, sample_rate) pieces with crossfades.
+
+        Pieces flagged in variable are scaled to the RMS level of the fixed
+        ones so slot values do not jump out of the prompt.
+        """
+        sample_rate = pieces[0][1]
+        if any(rate != sample_rate for _, rate in pieces):
+            raise Exception("Template pieces have different sample rates")
+        audios = [audio for audio, _ in pieces]
+
+        fixed_levels = [self._rms(audio) for audio, is_variable in zip(audios, variable) if not is_variable]
+        if fixed_levels:
+            target = float(np.mean(fixed_levels))
+            for index, is_variable in enumerate(variable):
+                level = self._rms(audios[index])
+                if is_variable and level > 0:
+                    audios[index] = audios[index] * np.float32(np.clip(target / level, 0.5, 2.0))
+
+        fade = int(self.crossfade * sample_rate)
+        fade = min([fade] + [len(audio) // 2 for audio in audios])
+        total = sum(len(audio) for audio in audios) - fade * (len(audios) - 1)
+        output = np.zeros((total,) + audios[0].shape[1:], dtype=np.float32)
+        ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32).reshape((fade,) + (1,) * (audios[0].ndim - 1))
+        position = 0
+        for index, audio in enumerate(audios):
+            audio = np.array(audio, dtype=np.float32)
+            if fade and index > 0:
+                audio[:fade] *= ramp
+            if fade and index < len(audios) - 1:
+                audio[len(audio) - fade:] *= ramp[::-1]
+            output[position:position + len(audio)] += audio
+            position += len(audio) - fade
+        np.clip(output, -1.0, 1.0, out=output)
+        return output, sample_rate
+
+    def _render_many(self, texts, dialect, emotion, store=False):
+        """Synthesize and post-process fragments concurrently, in order"""
+        if not texts:
+            return []
+        workers = max(1, min(self.engine.fetch_workers, len(texts)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda text: self._render_one(text, dialect, emotion, store), texts))
+
+    def _render_one(self, text, dialect, emotion, store):
+        # Units depend on the backend as well as the dialect and emotion they were rendered with
+        namespace = f"{self.engine.backend.cache_namespace}\0unit/{dialect}/{emotion}"
+        if store and self.store is not None:
+            cached = self.store.get(text, 'mr', False, namespace)
+            if cached is not None:
+                return cached
+        pieces = self.engine.fetch(text, dialect, emotion)
+        audio_data, sample_rate = self.engine.render(pieces, dialect, emotion)
+        unit = (self._trim(audio_data, sample_rate), sample_rate)
+        if store and self.store is not None:
+            return self.store.put(text, 'mr', False, *unit, namespace=namespace)
+        return unit
+
+    def _trim(self, audio_data, sample_rate):
+        """Cut leading and trailing silence, keeping a short edge of it"""
+        level = np.abs(audio_data) if audio_data.ndim == 1 else np.abs(audio_data).max(axis=1)
+        peak = float(level.max(initial=0.0))
+        if peak == 0.0:
+            return audio_data
+        voiced = np.flatnonzero(level > peak * 10 ** (-self.trim_db / 20))
+        edge = int(self.edge * sample_rate)
+        return audio_data[max(0, voiced[0] - edge):voiced[-1] + edge + 1]
+
+    @staticmethod
+    def _rms(audio_data):
+        return float(np.sqrt(np.mean(np.square(audio_data, dtype=np.float64)))) if len(audio_data) else 0.0
@@ -0,0 +1,191 @@
+import numpy as np
+
+
+class WSOLAStretcher:
+    """Streaming pitch-preserving time-scale modification (WSOLA).
+
+    Audio is fed block by block through ``process()`` and the remaining output
+    is drained with ``flush()``. Only about two frames of input and one frame of
+    output are kept between calls, so memory stays bounded and the cost per
+    output sample does not depend on the total signal length.
+
+    ``rate`` follows ``EmotionModifier.change_rhythm``: values above 1 speed
+    speech up (shorter output), values below 1 slow it down.
+    """
+
+    def __init__(self, rate, frame_length=1024, tolerance=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.frame_length = frame_length
+        self.synthesis_hop = frame_length // 2
+        self.analysis_hop = self.synthesis_hop * rate
+        # The search window should cover at least one pitch period
+        self.tolerance = tolerance if tolerance is not None else frame_length // 4
+
+        n = np.arange(frame_length)
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * n / frame_length)).astype(np.float32)
+        search_length = frame_length + 2 * self.tolerance
+        self._fft_size = 1 << (search_length - 1).bit_length()
+
+        self._input = np.zeros(0, dtype=np.float32)
+        self._input_start = 0
+        self._input_length = 0
+        self._frame = 0
+        self._previous = None
+        self._output = np.zeros(frame_length, dtype=np.float32)
+        self._weights = np.zeros(frame_length, dtype=np.float32)
+        self._emitted = 0
+        self._finished = False
+
+    def process(self, block):
+        """Consume a block of input samples and return the output that is final so far"""
+        block = np.asarray(block, dtype=np.float32)
+        if len(block):
+            self._input = np.concatenate((self._input, block))
+            self._input_length += len(block)
+
+        chunks = []
+        while self._frame_ready():
+            chunks.append(self._step())
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+    def flush(self):
+        """Finish the stream and return the remaining output"""
+        self._finished = True
+        target = int(self._input_length / self.rate)
+        chunks = []
+        while self._emitted < target:
+            chunk = self._step()
+            chunks.append(chunk[:target - (self._emitted - len(chunk))])
+        return np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+
+    def _nominal(self, frame):
+        return int(round(frame * self.analysis_hop))
+
+    def _frame_ready(self):
+        if self._finished:
+            return False
+        # Never emit past the output length the input received so far can justify
+        if self._emitted + self.synthesis_hop > int(self._input_length / self.rate):
+            return False
+        needed = self._nominal(self._frame) + self.tolerance + self.frame_length
+        if self._previous is not None:
+            needed = max(needed, self._previous + self.synthesis_hop + self.frame_length)
+        return needed <= self._input_length
+
+    def _read(self, start, length):
+        """Return input[start:start + length], zero-filled outside the buffered range"""
+        out = np.zeros(length, dtype=np.float32)
+        end = self._input_start + len(self._input)
+        lo = max(start, self._input_start)
+        hi = min(start + length, end)
+        if hi > lo:
+            out[lo - start:hi - start] = self._input[lo - self._input_start:hi - self._input_start]
+        return out
+
+    def _best_offset(self, nominal):
+        """Position near ``nominal`` whose frame best continues the previous frame"""
+        template = self._read(self._previous + self.synthesis_hop, self.frame_length)
+        region = self._read(nominal - self.tolerance, self.frame_length + 2 * self.tolerance)
+        # Cross-correlation through the FFT; lags up to 2 * tolerance never wrap around
+        spectrum = np.fft.rfft(region, self._fft_size) * np.conj(np.fft.rfft(template, self._fft_size))
+        correlation = np.fft.irfft(spectrum, self._fft_size)[:2 * self.tolerance + 1]
+        return nominal - self.tolerance + int(np.argmax(correlation))
+
+    def _step(self):
+        hop = self.synthesis_hop
+        nominal = self._nominal(self._frame)
+        position = nominal if self._previous is None else self._best_offset(nominal)
+
+        self._output += self._read(position, self.frame_length) * self.window
+        self._weights += self.window
+        ready = self._output[:hop] / np.maximum(self._weights[:hop], 1e-8)
+
+        self._output = np.concatenate((self._output[hop:], np.zeros(hop, dtype=np.float32)))
+        self._weights = np.concatenate((self._weights[hop:], np.zeros(hop, dtype=np.float32)))
+        self._previous = position
+        self._frame += 1
+        self._emitted += hop
+
+        # Drop input that no later frame or template can reach
+        keep_from = min(self._nominal(self._frame) - self.tolerance, position + hop)
+        if keep_from > self._input_start:
+            self._input = self._input[keep_from - self._input_start:]
+            self._input_start = keep_from
+        return ready
+
+
+def time_stretch(audio_data, rate, block_size=65536, **kwargs):
+    """Change speed by ``rate`` without changing pitch, processing in bounded blocks"""
+    audio_data = np.asarray(audio_data)
+    if audio_data.ndim > 1:
+        channels = [time_stretch(audio_data[:, c], rate, block_size, **kwargs)
+                    for c in range(audio_data.shape[1])]
+        return np.stack(channels, axis=1)
+
+    stretcher = WSOLAStretcher(rate, **kwargs)
+    chunks = [stretcher.process(audio_data[i:i + block_size])
+              for i in range(0, len(audio_data), block_size)]
+    chunks.append(stretcher.flush())
+    return np.concatenate(chunks)
+
+
+def time_stretch_batch(batch, lengths, rate, frame_length=1024, tolerance=None):
+    """Time-stretch the rows of a zero-padded 2-D batch in lockstep.
+
+    Row ``i`` holds ``lengths[i]`` samples followed by zeros. Each WSOLA step
+    handles every row at once, with a single batched FFT for the similarity
+    search, and gives the same output as ``time_stretch`` on each row alone.
+    Returns the stretched 2-D batch (zero past each row's end) and the output
+    length of every row.
+    """
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    batch = np.asarray(batch, dtype=np.float32)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    rows = len(batch)
+    hop = frame_length // 2
+    analysis_hop = hop * rate
+    tolerance = tolerance if tolerance is not None else frame_length // 4
+    targets = (lengths / rate).astype(np.int64)
+    frames = -(-int(targets.max(initial=0)) // hop)
+    if frames == 0:
+        return np.zeros((rows, 0), dtype=np.float32), targets
+
+    n = np.arange(frame_length)
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * n / frame_length)).astype(np.float32)
+    search_length = frame_length + 2 * tolerance
+    fft_size = 1 << (search_length - 1).bit_length()
+
+    # Zero padding on both sides stands in for reads outside the signal;
+    # column c of padded holds sample c - tolerance
+    last_nominal = int(round((frames - 1) * analysis_hop))
+    width = max(batch.shape[1], last_nominal + 2 * tolerance + hop + frame_length) + tolerance + 1
+    padded = np.zeros((rows, width), dtype=np.float32)
+    padded[:, tolerance:tolerance + batch.shape[1]] = batch
+
+    output = np.zeros((rows, frames * hop + frame_length), dtype=np.float32)
+    weights = np.zeros(frames * hop + frame_length, dtype=np.float32)
+    row_index = np.arange(rows)[:, None]
+    previous = None
+    for frame in range(frames):
+        nominal = int(round(frame * analysis_hop))
+        if previous is None:
+            position = np.full(rows, nominal, dtype=np.int64)
+        else:
+            template = padded[row_index, (previous + hop + tolerance)[:, None] + n]
+            region = padded[:, nominal:nominal + search_length]
+            spectrum = np.fft.rfft(region, fft_size, axis=1) * np.conj(np.fft.rfft(template, fft_size, axis=1))
+            correlation = np.fft.irfft(spectrum, fft_size, axis=1)[:, :2 * tolerance + 1]
+            position = nominal - tolerance + np.argmax(correlation, axis=1)
+
+        start = frame * hop
+        output[:, start:start + frame_length] += padded[row_index, (position + tolerance)[:, None] + n] * window
+        weights[start:start + frame_length] += window
+        previous = position
+
+    width = int(targets.max())
+    stretched = output[:, :width] / np.maximum(weights[:width], 1e-8)
+    stretched[np.arange(width) >= targets[:, None]] = 0.0
+    return stretched, targets